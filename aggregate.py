@@ -0,0 +1,103 @@
+"""Bucket distributions computed straight from a filter mask.
+
+The 15 bucket columns are held as one (sessions x 15) int8 code matrix.
+A single ``np.bincount`` over the masked codes, offset per column, gives
+every column's counts at once without building a filtered DataFrame.
+The joint counts of every column pair come from one matrix product of
+the one-hot encoded codes.
+"""
+import numpy as np
+import pandas as pd
+
+import schema
+
+N_LABELS = len(schema.LABEL_DTYPE.categories)
+# one slot per category plus a leading slot for missing values
+_SLOTS = N_LABELS + 1
+_OFFSETS = (np.arange(len(schema.BUCKET_COLUMNS)) * _SLOTS + 1).astype(np.int32)
+
+
+def bucket_codes(df: pd.DataFrame) -> np.ndarray:
+    """(sessions x bucket columns) int8 matrix of category codes (-1 = NaN)."""
+    return np.column_stack(
+        [df[col].cat.codes.to_numpy() for col in schema.BUCKET_COLUMNS]
+    ).astype(np.int8)
+
+
+def bucket_counts(codes: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+    """(bucket columns x categories) counts over the masked rows, NaN excluded."""
+    return grouped_bucket_counts(codes, None, 1, mask)[0]
+
+
+def grouped_bucket_counts(codes: np.ndarray,
+                          groups: np.ndarray | None,
+                          n_groups: int,
+                          mask: np.ndarray | None = None) -> np.ndarray:
+    """(groups x bucket columns x categories) counts in a single bincount.
+
+    ``groups`` gives each row's group id in ``range(n_groups)`` (e.g. an
+    instrument code for stacked datasets); None puts every row in group 0.
+    """
+    selected = codes if mask is None else codes[mask]
+    flat = selected.astype(np.int32) + _OFFSETS
+    if groups is not None:
+        selected_groups = groups if mask is None else groups[mask]
+        flat += (selected_groups.astype(np.int32) * _OFFSETS.size * _SLOTS)[:, None]
+    counts = np.bincount(flat.ravel(), minlength=n_groups * _OFFSETS.size * _SLOTS)
+    return counts.reshape(n_groups, _OFFSETS.size, _SLOTS)[:, :, 1:]
+
+
+def one_hot(codes: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+    """(sessions x columns*labels) float32 indicators; NaN buckets are all-zero."""
+    selected = codes if mask is None else codes[mask]
+    out = np.zeros((selected.shape[0], selected.shape[1] * N_LABELS), dtype=np.float32)
+    rows, cols = np.nonzero(selected >= 0)
+    out[rows, cols * N_LABELS + selected[rows, cols]] = 1
+    return out
+
+
+def joint_counts(codes: np.ndarray, mask: np.ndarray | None = None) -> np.ndarray:
+    """(column x label x column x label) co-occurrence counts of every column pair.
+
+    ``joint[a, i, b, j]`` is the number of masked sessions where column
+    ``a`` has label ``i`` and column ``b`` has label ``j``, all 15 x 15
+    contingency tables from a single ``X.T @ X``.
+    """
+    x = one_hot(codes, mask)
+    # float32 sums are exact well past any session count (2**24)
+    joint = np.rint(x.T @ x).astype(np.int64)
+    k = codes.shape[1]
+    return joint.reshape(k, N_LABELS, k, N_LABELS)
+
+
+def conditional_percent(joint: np.ndarray, given: int, target: int) -> np.ndarray:
+    """(given labels x target labels) P(target bucket | given bucket) in percent."""
+    return to_percent(joint[given, :, target, :])
+
+
+def to_percent(counts: np.ndarray) -> np.ndarray:
+    """Normalize counts over the last axis to percentages, 0 where empty."""
+    totals = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(totals > 0, counts * 100.0 / totals, 0.0)
+
+
+def distribution_table(perc: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame(
+        perc,
+        index=schema.BUCKET_COLUMNS,
+        columns=list(schema.LABEL_DTYPE.categories),
+    )
+
+
+def bucket_distributions(codes: np.ndarray,
+                         mask: np.ndarray | None = None) -> tuple[pd.DataFrame, int]:
+    """Percentage distribution of every bucket column, plus the sample size.
+
+    Rows are schema.BUCKET_COLUMNS, columns the bucket labels in segment
+    order. Matches ``value_counts(normalize=True) * 100`` per column, with
+    0 where a column has no non-missing rows.
+    """
+    perc = to_percent(bucket_counts(codes, mask))
+    n = len(codes) if mask is None else int(np.count_nonzero(mask))
+    return distribution_table(perc), n
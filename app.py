@@ -1,20 +1,38 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
+
+import aggregate
+import charts
+import compare
+import data_store
+import dist_cache
+import filters
+import preload
+import profiling
+import query
+import schema
+import search
 
 st.set_page_config(layout='wide')
 
-@st.cache_data
-def load_data_for_instrument(instrument: str) -> pd.DataFrame:
-    base = "https://raw.githubusercontent.com/TuckerArrants/sessions/main"
-    fname = f"{instrument}_Session_Hits_With_Mids_Processed_from_2008.csv"
-    url = f"{base}/{fname}"
-    try:
-        return pd.read_csv(url)
-    except Exception:
-        # fallback to empty DF if file not found or network hiccup
-        return pd.DataFrame()
+@st.cache_resource
+def get_preloader() -> preload.Preloader:
+    # starts loading every instrument in the background at server start;
+    # the loaded datasets are shared read-only by all sessions
+    return preload.Preloader(data_store.INSTRUMENTS)
+
+@st.cache_resource(max_entries=8)
+def get_comparison(versions: tuple) -> compare.Comparison:
+    # stacked once per selection and data versions, shared by all sessions;
+    # bounded, so stacks of replaced data versions are evicted
+    preloader = get_preloader()
+    return compare.Comparison([preloader.get(inst) for inst, _ in versions])
+
+@st.cache_resource
+def get_distribution_cache() -> dist_cache.LRUCache:
+    # one LRU for every session, keyed by instrument, data version and filters
+    return dist_cache.LRUCache(maxsize=512)
 
 # ✅ Store username-password pairs
 USER_CREDENTIALS = {
@@ -23,14 +41,10 @@ USER_CREDENTIALS = {
     "Almkuh"    : "Weidemilch",
 }
 
-segments = {
-    "PRDR-ADR Transition":        (   0,  90),
-    "ADR":            (  90, 480),
-    "ADR-ODR Transition": ( 480, 540),
-    "ODR":            ( 540, 870),
-    "ODR-RDR Transition": ( 870, 930),
-    "RDR":            ( 930,1380),
-}
+segments = {schema.BUCKET_LABELS[k]: window for k, window in schema.SEGMENT_WINDOWS.items()}
+
+# kick off the background preload while the login page is still showing
+get_preloader()
 
 # ✅ Initialize session state for authentication
 if "authenticated" not in st.session_state:
@@ -51,10 +65,10 @@ if not st.session_state["authenticated"]:
         if username in USER_CREDENTIALS and password == USER_CREDENTIALS[username]:
             st.session_state["authenticated"] = True
             st.session_state["username"] = username  # Store the username
-            # ← Clear *all* @st.cache_data caches here:
-            st.cache_data.clear()
+            # no cache clearing here: the preloader reloads an instrument
+            # by itself when its data file changes
 
-            st.success(f"Welcome, {username}! Loading fresh data…")
+            st.success(f"Welcome, {username}!")
             st.rerun()
         else:
             st.error("Incorrect username or password. Please try again.")
@@ -66,29 +80,37 @@ if not st.session_state["authenticated"]:
 st.title("Trompete Kostet Knete")
 
 # ↓ in your sidebar:
-instrument_options = ["ES", "NQ", "YM", "CL", "GC", "NG", "HG", "SI", "E6", "FDAX"]
+instrument_options = data_store.local_instruments()
 selected_instrument = st.sidebar.selectbox("Instrument", instrument_options)
+compare_instruments = st.sidebar.multiselect(
+    "Compare instruments", instrument_options, key="compare_instruments"
+)
 
-df = load_data_for_instrument(selected_instrument)
-df['date'] = pd.to_datetime(df['session_date']).dt.date
-
-rename_map = {'pre_adr' : 'PRDR-ADR Transition',
-              'adr' : 'ADR',
-              'adr_transition' : 'ADR-ODR Transition',
-              'odr' : 'ODR',
-              'odr_transition' : 'ODR-RDR Transition',
-              'rdr' : 'RDR',
-              'untouched' : 'Untouched',
-}
-
-df = df.replace(rename_map)
-
-# 1) Make sure 'date' is a datetime column
-if "date" in df.columns:
-    df["date"] = pd.to_datetime(df["session_date"])
-else:
-    st.sidebar.warning("No 'date' column found in your data!")
+# opt-in stage timing; off, the profiler calls below are no-ops
+profile_rerun = st.sidebar.toggle("Profile reruns", key="profiling") or profiling.enabled_by_env()
+profiler = profiling.Profiler(profile_rerun, instrument=selected_instrument,
+                              user=st.session_state["username"])
 
+with profiler.stage("data load"):
+    try:
+        dataset = get_preloader().get(selected_instrument)
+    except FileNotFoundError as e:
+        st.error(str(e))
+        st.stop()
+    # the dataset is shared by all sessions; this session only keeps its
+    # widget state, and df shares the dataset's buffers
+    df = dataset.view()
+for step, seconds in dataset.timings.items():
+    # once per data version, in the background preload; "(last build)"
+    # steps are the ingest of the store build this load read from
+    profiler.add_stage(f"data load (once): {step}", seconds)
+profiler.note_frame("df (dataset view)", df, shared=True)
+
+with st.sidebar.expander("Data status"):
+    for inst, state in get_preloader().status().items():
+        icon = {"ready": "✅", "loading": "⏳"}.get(state, "❌")
+        st.caption(f"{icon} {inst}: {state}")
+    st.caption(f"Shared across sessions: {get_preloader().nbytes() / 2**20:,.1f} MB")
 
 # SIDEBAR
 day_options = ['All'] + ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
@@ -369,77 +391,41 @@ with row6_cols[2]:
 # Apply filters
 st.markdown("### Distributions")
 
-# map each filter to its column
-inclusion_map = {
-    "prev_rdr_high_touch_time_bucket":       "prdr_high_filter",
-    "pre_adr_high_touch_time_bucket":        "prdr_adr_transition_high_filter",
-    "adr_high_touch_time_bucket":            "adr_high_filter",
-    "adr_transition_high_touch_time_bucket": "adr_odr_transition_high_filter",
-    "odr_high_touch_time_bucket":            "odr_high_filter",
-    "odr_transition_high_touch_time_bucket": "odr_rdr_transition_high_filter",
-
-    "prev_rdr_low_touch_time_bucket":        "prdr_low_filter",
-    "pre_adr_low_touch_time_bucket":         "prdr_adr_transition_low_filter",
-    "adr_low_touch_time_bucket":             "adr_low_filter",
-    "adr_transition_low_touch_time_bucket":  "adr_odr_transition_low_filter",
-    "odr_low_touch_time_bucket":             "odr_low_filter",
-    "odr_transition_low_touch_time_bucket":  "odr_rdr_transition_low_filter",
-
-    "prev_rdr_idr_midline_touch_time_bucket":       "prdr_mid_hit_filter",
-    "adr_idr_midline_touch_time_bucket":       "adr_mid_hit_filter",
-    "odr_idr_midline_touch_time_bucket":       "odr_mid_hit_filter",
-}
+# APPLY FILTERS
+with profiler.stage("filter state"):
+    filter_state = dist_cache.normalize_filters(
+        st.session_state["selected_day"],
+        st.session_state["date_range"],
+        *filters.selections_from_state(st.session_state),
+    )
 
-exclusion_map = {
-    "prev_rdr_high_touch_time_bucket":       "prdr_high_filter_exclusion",
-    "pre_adr_high_touch_time_bucket":        "prdr_adr_transition_high_filter_exclusion",
-    "adr_high_touch_time_bucket":            "adr_high_filter_exclusion",
-    "adr_transition_high_touch_time_bucket": "adr_odr_transition_high_filter_exclusion",
-    "odr_high_touch_time_bucket":            "odr_high_filter_exclusion",
-    "odr_transition_high_touch_time_bucket": "odr_rdr_transition_high_filter_exclusion",
-
-    "prev_rdr_low_touch_time_bucket":        "prdr_low_filter_exclusion",
-    "pre_adr_low_touch_time_bucket":         "prdr_adr_transition_low_filter_exclusion",
-    "adr_low_touch_time_bucket":             "adr_low_filter_exclusion",
-    "adr_transition_low_touch_time_bucket":  "adr_odr_transition_low_filter_exclusion",
-    "odr_low_touch_time_bucket":             "odr_low_filter_exclusion",
-    "odr_transition_low_touch_time_bucket":  "odr_rdr_transition_low_filter_exclusion",
-
-    "prev_rdr_idr_midline_touch_time_bucket":       "prdr_mid_hit_filter_exclusion",
-    "adr_idr_midline_touch_time_bucket":            "adr_mid_hit_filter_exclusion",
-    "odr_idr_midline_touch_time_bucket":            "odr_mid_hit_filter_exclusion",
-}
+def current_mask():
+    # the filters resolve to bitwise ops on the bucket bitmaps
+    return query.filter_mask(dataset, filter_state)
 
+def compute_distributions():
+    # all 15 distributions come from one pass over the bucket codes
+    return query.distributions(dataset, filter_state)
 
-# APPLY FILTERS
-df_filtered = df.copy()
-
-# — Day-of-week (shifted by +1 day) —
-sel_day = st.session_state["selected_day"]
-if sel_day != "All":
-    df_filtered = df_filtered[
-        (df_filtered["date"] + pd.Timedelta(days=1)).dt.day_name() == sel_day
-    ]
-
-# — Date range —
-start_date, end_date = st.session_state["date_range"]
-df_filtered = df_filtered[
-    (df_filtered["date"] >= pd.to_datetime(start_date)) &
-    (df_filtered["date"] <= pd.to_datetime(end_date))
-]
-
-for col, state_key in inclusion_map.items():
-    sel = st.session_state[state_key]
-    if sel != "All":
-        df_filtered = df_filtered[df_filtered[col] == sel]
+with profiler.stage("filtering + distributions"):
+    key = dist_cache.cache_key(selected_instrument, dataset.version, filter_state)
+    dist, sample_size = profiler.cached(
+        "distributions", get_distribution_cache(), key, compute_distributions
+    )
+profiler.note_frame("distribution table", dist)
 
-for col, state_key in exclusion_map.items():
-    excludes = st.session_state[state_key]
-    if excludes:
-        df_filtered = df_filtered[~df_filtered[col].isin(excludes)]
-        
 # GRAPHS
-df_plot = df.copy()
+# figures are built once per session; later reruns only swap the bar values
+if "chart_builder" not in st.session_state:
+    st.session_state["chart_builder"] = charts.BarChartBuilder(segment_order_with_no)
+chart_builder = st.session_state["chart_builder"]
+
+def render_bar_row(cols, titles):
+    row = st.columns(len(cols))
+    for idx, col in enumerate(cols):
+        if col in dist.index:
+            fig = chart_builder.figure(titles[idx], dist.loc[col].values)
+            row[idx].plotly_chart(fig, use_container_width=True)
 
 # MIDS touch-time buckets
 mid_cols = [
@@ -453,30 +439,8 @@ mid_titles = [
     "ODR Mid",
 ]
 
-row1 = st.columns(3)
-for idx, col in enumerate(mid_cols):
-    if col in df_filtered:
-        counts = (
-            df_filtered[col]
-            .value_counts(normalize=True)
-            .reindex(segment_order_with_no, fill_value=0)
-        )
-        perc = counts * 100
-
-        fig = px.bar(
-            x=perc.index,
-            y=perc.values,
-            text=[f"{v:.1f}%" for v in perc.values],
-            labels={"x": "", "y": "% of Sessions"},
-            title=mid_titles[idx],
-        )
-        fig.update_traces(textposition="outside")
-        fig.update_layout(
-            xaxis={"categoryorder": "array", "categoryarray": segment_order_with_no},
-            margin=dict(l=10, r=10, t=30, b=10),
-        )
-
-        row1[idx].plotly_chart(fig, use_container_width=True)
+with profiler.stage("charts: mids"):
+    render_bar_row(mid_cols, mid_titles)
 
 
 
@@ -498,30 +462,8 @@ high_titles = [
     "ODR-RDR Transition High",
 ]
 
-row2 = st.columns(6)
-for idx, col in enumerate(high_cols):
-    if col in df_filtered:
-        counts = (
-            df_filtered[col]
-            .value_counts(normalize=True)
-            .reindex(segment_order_with_no, fill_value=0)
-        )
-        perc = counts * 100
-
-        fig = px.bar(
-            x=perc.index,
-            y=perc.values,
-            text=[f"{v:.1f}%" for v in perc.values],
-            labels={"x": "", "y": "% of Sessions"},
-            title=high_titles[idx],
-        )
-        fig.update_traces(textposition="outside")
-        fig.update_layout(
-            xaxis={"categoryorder": "array", "categoryarray": segment_order_with_no},
-            margin=dict(l=10, r=10, t=30, b=10),
-        )
-
-        row2[idx].plotly_chart(fig, use_container_width=True)
+with profiler.stage("charts: highs"):
+    render_bar_row(high_cols, high_titles)
 
 
 # LOW touch‐time buckets
@@ -542,29 +484,138 @@ low_titles = [
     "ODR-RDR Transition Low",
 ]
 
-row3 = st.columns(6)
-for idx, col in enumerate(low_cols):
-    if col in df_filtered:
-        counts = (
-            df_filtered[col]
-            .value_counts(normalize=True)
-            .reindex(segment_order_with_no, fill_value=0)
+with profiler.stage("charts: lows"):
+    render_bar_row(low_cols, low_titles)
+
+with profiler.stage("caption"):
+    st.caption(f"Sample size: {sample_size:,} rows")
+
+# CONDITIONAL PROBABILITIES
+# every pairwise contingency table comes out of one matrix product, so
+# switching the pair below costs nothing
+st.markdown("### Conditional Probabilities")
+
+bucket_titles = dict(zip(mid_cols + high_cols + low_cols, mid_titles + high_titles + low_titles))
+title_options = list(bucket_titles.values())
+
+cond_cols = st.columns(2)
+with cond_cols[0]:
+    given_title = st.selectbox("Given", title_options,
+                               index=title_options.index("ADR High"), key="cond_given")
+with cond_cols[1]:
+    target_title = st.selectbox("Target", title_options,
+                                index=title_options.index("ODR High"), key="cond_target")
+
+with profiler.stage("conditional probabilities"):
+    joint_key = dist_cache.cache_key(selected_instrument, dataset.version, filter_state, kind="joint")
+    joint = profiler.cached(
+        "joint counts", get_distribution_cache(), joint_key,
+        lambda: aggregate.joint_counts(dataset.codes, current_mask()),
+    )
+
+    given = schema.BUCKET_COLUMNS.index(next(c for c, t in bucket_titles.items() if t == given_title))
+    target = schema.BUCKET_COLUMNS.index(next(c for c, t in bucket_titles.items() if t == target_title))
+    given_counts = joint[given, :, given, :].diagonal()
+    fig = charts.heatmap_figure(
+        f"P({target_title} bucket | {given_title} bucket)",
+        aggregate.conditional_percent(joint, given, target),
+        x=segment_order_with_no,
+        y=[f"{label} (n={n:,})" for label, n in zip(segment_order_with_no, given_counts)],
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+# CONDITION SEARCH
+# scores every single and pairwise inclusion against a target bucket,
+# within the current filters
+st.markdown("### Condition Search")
+search_cols = st.columns([2, 2, 1])
+with search_cols[0]:
+    search_target_title = st.selectbox("Target", title_options,
+                                       index=title_options.index("ODR High"), key="search_target")
+with search_cols[1]:
+    search_bucket = st.selectbox("Touched in", segment_order_with_no,
+                                 index=segment_order_with_no.index("RDR"), key="search_bucket")
+with search_cols[2]:
+    search_min = st.number_input("Min sessions", min_value=1, value=30, step=10, key="search_min")
+
+if st.toggle("Run search", key="search_enabled"):
+    with profiler.stage("condition search"):
+        search_target = next(c for c, t in bucket_titles.items() if t == search_target_title)
+        search_key = dist_cache.cache_key(
+            selected_instrument, dataset.version, filter_state,
+            kind=f"search:{search_target}:{search_bucket}:{search_min}",
         )
-        perc = counts * 100
-
-        fig = px.bar(
-            x=perc.index,
-            y=perc.values,
-            text=[f"{v:.1f}%" for v in perc.values],
-            labels={"x": "", "y": "% of Sessions"},
-            title=low_titles[idx],
+        ranked = profiler.cached(
+            "condition search", get_distribution_cache(), search_key,
+            lambda: search.rank_conditions(dataset.codes, search_target, search_bucket,
+                                           current_mask(), min_sessions=search_min),
         )
-        fig.update_traces(textposition="outside")
-        fig.update_layout(
-            xaxis={"categoryorder": "array", "categoryarray": segment_order_with_no},
-            margin=dict(l=10, r=10, t=30, b=10),
+        rate, base_n = search.base_rate(dataset.codes, search_target, search_bucket, current_mask())
+        st.caption(f"Base rate: {rate:.1f}% of {base_n:,} sessions")
+
+        def describe(col, bucket):
+            return f"{bucket_titles[col]} in {bucket}" if isinstance(col, str) else ""
+
+        st.dataframe(
+            pd.DataFrame({
+                "Condition": [describe(c, b) for c, b in zip(ranked["column"], ranked["bucket"])],
+                "And": [describe(c, b) for c, b in zip(ranked["column_2"], ranked["bucket_2"])],
+                "Sessions": ranked["sessions"],
+                "Probability %": ranked["probability"].round(1),
+                "Lift": ranked["lift"].round(2),
+            }).head(100),
+            use_container_width=True,
+            hide_index=True,
         )
 
-        row3[idx].plotly_chart(fig, use_container_width=True)
-
-st.caption(f"Sample size: {len(df_filtered):,} rows")
+# INSTRUMENT COMPARISON
+# the same filters applied to every selected instrument in one batched pass
+if compare_instruments:
+    with profiler.stage("instrument comparison"):
+        st.markdown("### Instrument Comparison")
+
+        preloader = get_preloader()
+        loaded = {}
+        for inst in compare_instruments:
+            try:
+                loaded[inst] = preloader.get(inst).version
+            except Exception as e:
+                st.warning(f"{inst} could not be loaded and is left out: {e}")
+        if loaded:
+            versions = tuple(sorted(loaded.items()))
+            results = get_comparison(versions).distributions(
+                list(loaded),
+                day=filter_state["day"],
+                date_range=filter_state.get("date_range"),
+                inclusions=filter_state["inclusions"],
+                exclusions=filter_state["exclusions"],
+            )
+
+            def render_grouped_row(cols, titles):
+                row = st.columns(len(cols))
+                for idx, col in enumerate(cols):
+                    series = {inst: table.loc[col].values for inst, (table, _) in results.items()}
+                    fig = charts.grouped_bar_figure(titles[idx], segment_order_with_no, series)
+                    row[idx].plotly_chart(fig, use_container_width=True)
+
+            render_grouped_row(mid_cols, mid_titles)
+            render_grouped_row(high_cols, high_titles)
+            render_grouped_row(low_cols, low_titles)
+
+            st.caption("Sample sizes: " + ", ".join(f"{inst} {n:,}" for inst, (_, n) in results.items()))
+
+# PROFILING
+if profiler.enabled:
+    with st.sidebar.expander("⏱ Profiling", expanded=True):
+        st.dataframe(profiler.report().round(2), hide_index=True, use_container_width=True)
+        for c in profiler.caches:
+            st.caption(f"{c['cache']}: {'hit' if c['hit'] else 'miss'}")
+        for f in profiler.frames:
+            shared = " (shared)" if f["shared"] else ""
+            st.caption(f"{f['frame']}: {f['rows']:,} rows, {f['bytes'] / 2**10:,.0f} KB{shared}")
+        stats = get_distribution_cache().stats()
+        st.caption(
+            f"Distribution cache: {stats['hits']:,} hits, {stats['misses']:,} misses "
+            f"({stats['hit_rate']:.0%}), {stats['size']}/{stats['maxsize']} entries"
+        )
+    profiler.emit()
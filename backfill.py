@@ -0,0 +1,165 @@
+"""Parallel full-history rebuild of the Session_Hits data from bars.
+
+Work is sharded by instrument and by year chunk and run on a process
+pool. Each shard reads only its own slice of the bars, plus the overlap
+session whose RDR feeds ``prev_rdr_*``. Instruments that only have
+``bars/<instrument>_5m.csv`` are converted into the memory-mapped bar
+store (bar_store.py) once, up front, so every shard's slice is a
+zero-copy view and the total read work stays linear in the history.
+Without conversion, shards stream the CSV up to the end of their range.
+Worker memory is bounded by the shard size, not by the full history.
+Shard results are merged in (instrument, year) order, so the output does
+not depend on completion order.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+
+import bar_store
+import data_store
+import session_engine
+
+# far enough back to always include the previous session's RDR, across
+# weekends and exchange holidays
+OVERLAP = pd.Timedelta(days=7)
+
+
+def bars_path(instrument: str) -> Path:
+    return bar_store.BARS_DIR / f"{instrument}_5m.csv"
+
+
+@dataclass(frozen=True)
+class Shard:
+    instrument: str
+    start: pd.Timestamp  # first session_date of the shard
+    end: pd.Timestamp    # first session_date after the shard
+
+    def __str__(self):
+        return f"{self.instrument} {self.start.year}-{self.end.year - 1}"
+
+
+def plan_shards(instruments: list[str], first_year: int, last_year: int,
+                years_per_shard: int = 2) -> list[Shard]:
+    return [
+        Shard(inst, pd.Timestamp(year=y, month=1, day=1),
+              pd.Timestamp(year=min(y + years_per_shard, last_year + 1), month=1, day=1))
+        for inst in instruments
+        for y in range(first_year, last_year + 1, years_per_shard)
+    ]
+
+
+def read_bar_range(path: Path, start: pd.Timestamp, end: pd.Timestamp,
+                   chunksize: int = 500_000) -> pd.DataFrame:
+    """Bars with ``start <= timestamp < end``, streamed in chunks.
+
+    The bars must be in time order (as bar_store requires), so reading
+    stops at the first chunk that reaches ``end``.
+    """
+    parts = []
+    for chunk in pd.read_csv(path, usecols=session_engine.BAR_COLUMNS,
+                             parse_dates=["timestamp"], chunksize=chunksize):
+        ts = chunk["timestamp"]
+        if not ts.is_monotonic_increasing:
+            raise ValueError(f"{path} is not sorted by timestamp")
+        if len(ts) and ts.iloc[-1] >= start:
+            parts.append(chunk[(ts >= start) & (ts < end)])
+        if len(ts) and ts.iloc[-1] >= end:
+            break
+    if not parts:
+        return pd.DataFrame(columns=session_engine.BAR_COLUMNS)
+    return pd.concat(parts, ignore_index=True)
+
+
+def run_shard(shard: Shard) -> tuple[Shard, pd.DataFrame, float]:
+    t0 = time.perf_counter()
+    if bar_store.exists(shard.instrument):
+        # zero-copy slice of the memory-mapped bars, one overlap session back
+        store = bar_store.BarStore(shard.instrument)
+        bars = store.session_range(shard.start, shard.end, overlap=1)
+        rows = session_engine.process_bars(bars, shard.instrument)
+    else:
+        bars = read_bar_range(
+            bars_path(shard.instrument),
+            shard.start + session_engine.SESSION_OPEN - OVERLAP,
+            shard.end + session_engine.SESSION_OPEN,
+        )
+        rows = session_engine.process_bars(bars, shard.instrument)
+    rows = rows[(rows["session_date"] >= shard.start) & (rows["session_date"] < shard.end)]
+    return shard, rows.reset_index(drop=True), time.perf_counter() - t0
+
+
+def convert_bars(instruments: list[str], log=print) -> None:
+    """Build the bar store of every instrument that only has a bar CSV."""
+    for inst in instruments:
+        if bar_store.exists(inst) or not bars_path(inst).exists():
+            continue
+        t0 = time.perf_counter()
+        n = bar_store.convert_csv(inst, bars_path(inst))
+        log(f"{inst}: converted {n:,} bars in {time.perf_counter() - t0:.1f}s")
+
+
+def backfill(instruments: list[str], first_year: int, last_year: int,
+             years_per_shard: int = 2, max_workers: int | None = None,
+             tasks_per_child: int | None = None, convert: bool = True,
+             log=print) -> dict[str, pd.DataFrame]:
+    """Rebuild every instrument's rows; returns ``{instrument: frame}``."""
+    if convert:
+        convert_bars(instruments, log)
+    shards = plan_shards(instruments, first_year, last_year, years_per_shard)
+    results = {}
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             max_tasks_per_child=tasks_per_child) as pool:
+        futures = [pool.submit(run_shard, shard) for shard in shards]
+        for fut in as_completed(futures):
+            shard, rows, secs = fut.result()
+            results[shard] = rows
+            log(f"{shard}: {len(rows):,} sessions in {secs:.1f}s "
+                f"({len(rows) / secs if secs else 0:,.0f} sessions/sec)")
+
+    elapsed = time.perf_counter() - t0
+    total = sum(len(rows) for rows in results.values())
+    log(f"total: {total:,} sessions in {elapsed:.1f}s "
+        f"({total / elapsed if elapsed else 0:,.0f} sessions/sec)")
+
+    merged = {}
+    for inst in instruments:
+        parts = [results[s] for s in shards if s.instrument == inst]
+        merged[inst] = pd.concat(parts, ignore_index=True)
+    return merged
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild Session_Hits data from bars/")
+    parser.add_argument("instruments", nargs="*", default=data_store.INSTRUMENTS)
+    parser.add_argument("--from-year", type=int, default=2008)
+    parser.add_argument("--to-year", type=int, default=pd.Timestamp.today().year)
+    parser.add_argument("--years-per-shard", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tasks-per-child", type=int, default=None,
+                        help="recycle workers after this many shards")
+    parser.add_argument("--no-convert", action="store_true",
+                        help="stream bar CSVs per shard instead of building the bar store")
+    parser.add_argument("--out", type=Path, default=Path("backfill_out"),
+                        help="directory for the rebuilt CSVs")
+    parser.add_argument("--install", action="store_true",
+                        help="replace the shipped CSVs and rebuild the store")
+    args = parser.parse_args()
+
+    frames = backfill(args.instruments, args.from_year, args.to_year,
+                      args.years_per_shard, args.workers, args.tasks_per_child,
+                      not args.no_convert)
+    for inst, rows in frames.items():
+        if args.install:
+            data_store.write_csv(inst, rows)
+            print(f"{inst}: installed {len(rows):,} sessions")
+        else:
+            args.out.mkdir(parents=True, exist_ok=True)
+            dest = args.out / data_store.csv_path(inst).name
+            dest.write_bytes(data_store.csv_bytes(rows))
+            print(f"{inst}: wrote {dest}")
@@ -0,0 +1,162 @@
+"""Memory-mapped 5-minute bar storage for the processing pipeline.
+
+Each instrument's bars live in ``bars/<instrument>.bars.npy`` as one
+fixed-width structured array: a datetime64[ns] timestamp and OHLC as
+int64 price units of the instrument spec (instruments.py), sorted by
+time. ``bars/<instrument>.sessions.npy`` holds a per-session (date,
+start, stop) offset index into it, and ``bars/<instrument>.meta.json``
+records the units per point the prices were written with.
+
+The files are opened with ``np.load(mmap_mode="r")``, so selecting a
+range of sessions is a zero-copy slice. Several worker processes
+reading the same instrument share the OS page cache instead of each
+holding a private copy.
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import instruments
+import session_engine
+
+BARS_DIR = data_store.DATA_DIR / "bars"
+
+BAR_DTYPE = np.dtype([
+    ("timestamp", "datetime64[ns]"),
+    ("open", "<i8"),
+    ("high", "<i8"),
+    ("low", "<i8"),
+    ("close", "<i8"),
+])
+SESSION_DTYPE = np.dtype([
+    ("session_date", "datetime64[D]"),
+    ("start", "<i8"),
+    ("stop", "<i8"),
+])
+
+
+def _paths(instrument: str, root: Path | None = None) -> tuple[Path, Path, Path]:
+    root = root or BARS_DIR
+    return (
+        root / f"{instrument}.bars.npy",
+        root / f"{instrument}.sessions.npy",
+        root / f"{instrument}.meta.json",
+    )
+
+
+def exists(instrument: str, root: Path | None = None) -> bool:
+    return all(p.exists() for p in _paths(instrument, root))
+
+
+def _count_rows(path: Path) -> int:
+    """Upper bound on the data rows: line count minus the header."""
+    lines, last = 0, b"\n"
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def convert_csv(instrument: str, csv: Path,
+                root: Path | None = None, chunksize: int = 1_000_000) -> int:
+    """Convert a timestamp,open,high,low,close CSV into the mmap store.
+
+    The CSV is streamed in chunks straight into the memory-mapped output,
+    so memory stays flat for any file size. Bars must already be in time
+    order. Returns the number of bars written.
+    """
+    bars_path, sessions_path, meta_path = _paths(instrument, root)
+    bars_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = bars_path.with_suffix(".tmp.npy")
+
+    per_point = instruments.spec(instrument).units_per_point
+    n = _count_rows(csv)
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=BAR_DTYPE, shape=(n,))
+    pos = 0
+    last = np.datetime64("NaT")
+    for chunk in pd.read_csv(csv, usecols=session_engine.BAR_COLUMNS,
+                             parse_dates=["timestamp"], chunksize=chunksize):
+        ts = chunk["timestamp"].to_numpy(dtype="datetime64[ns]")
+        if len(ts) and (np.any(ts[1:] < ts[:-1]) or (not np.isnat(last) and ts[0] < last)):
+            raise ValueError(f"{csv} is not sorted by timestamp")
+        block = out[pos:pos + len(chunk)]
+        block["timestamp"] = ts
+        for col in ("open", "high", "low", "close"):
+            block[col] = np.rint(chunk[col].to_numpy(np.float64) * per_point).astype(np.int64)
+        pos += len(chunk)
+        last = ts[-1] if len(ts) else last
+    out.flush()
+    if pos < n:
+        # blank lines were counted but skipped by the parser
+        np.save(bars_path, out[:pos])
+        del out
+        os.unlink(tmp)
+    else:
+        del out
+        os.replace(tmp, bars_path)
+
+    sessions = build_session_index(np.load(bars_path, mmap_mode="r")["timestamp"])
+    np.save(sessions_path, sessions)
+    meta_path.write_text(json.dumps({"units_per_point": per_point, "bars": pos}, indent=2))
+    return pos
+
+
+def build_session_index(ts: np.ndarray) -> np.ndarray:
+    """(session_date, start, stop) rows for time-sorted bar timestamps."""
+    session_dates, _ = session_engine.session_clock(ts)
+    starts = np.flatnonzero(np.r_[True, session_dates[1:] != session_dates[:-1]])[:len(ts)]
+    index = np.empty(len(starts), dtype=SESSION_DTYPE)
+    index["session_date"] = session_dates[starts]
+    index["start"] = starts
+    index["stop"] = np.r_[starts[1:], len(ts)]
+    return index
+
+
+class BarStore:
+    """Read-only, memory-mapped view of one instrument's bars."""
+
+    def __init__(self, instrument: str, root: Path | None = None):
+        bars_path, sessions_path, meta_path = _paths(instrument, root)
+        self.instrument = instrument
+        self.bars = np.load(bars_path, mmap_mode="r")
+        self.sessions = np.load(sessions_path, mmap_mode="r")
+        meta = json.loads(meta_path.read_text())
+        if meta.get("units_per_point") != instruments.spec(instrument).units_per_point:
+            raise ValueError(f"{bars_path} was written with other price units; "
+                             f"reconvert it with bar_store.convert_csv")
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    def session_range(self, start, end, overlap: int = 0) -> np.ndarray:
+        """Zero-copy slice of the bars of sessions dated ``start <= date < end``.
+
+        ``overlap`` extends the slice back by that many earlier sessions,
+        e.g. 1 for the session whose RDR feeds ``prev_rdr_*``.
+        """
+        dates = self.sessions["session_date"]
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "D"), side="left")
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "D"), side="left")
+        lo = max(lo - overlap, 0)
+        if lo >= hi:
+            return self.bars[:0]
+        return self.bars[self.sessions["start"][lo]:self.sessions["stop"][hi - 1]]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a bar CSV into the mmap bar store")
+    parser.add_argument("instrument")
+    parser.add_argument("csv", type=Path)
+    args = parser.parse_args()
+
+    n = convert_csv(args.instrument, args.csv)
+    print(f"{args.instrument}: {n:,} bars -> {BARS_DIR}")
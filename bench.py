@@ -0,0 +1,308 @@
+"""Benchmarks for the load, label, filter, aggregate and render stages.
+
+Each stage is timed both the way the original script did it (raw
+``pd.read_csv``, ``df.replace``, chained boolean indexing,
+``value_counts`` and a fresh ``px.bar`` per chart) and the way the
+current modules do it. Load and label stages run on the bundled CSVs.
+Filter and aggregate stages also run on the instrument scaled 10x-1000x,
+either by repeating its sessions or with synthetic sessions (synth.py),
+over a few representative filter mixes.
+
+Every stage reports the median wall time over ``--repeats`` runs, after
+one warm-up, and its peak traced allocation (tracemalloc, in a separate
+run so tracing does not skew the timings). A run is appended to a JSON
+history and compared with the previous run of the same benchmark, so
+regressions and wins show up as numbers.
+
+    python bench.py --scales 1 10 100 --repeats 5
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import aggregate
+import bitmap_index
+import charts
+import data_store
+import filters
+import ingest
+import schema
+import synth
+
+HISTORY_PATH = data_store.DATA_DIR / "bench_history.json"
+
+MIXES = {
+    "none": {},
+    "one_inclusion": {
+        "inclusions": {"adr_high_touch_time_bucket": "ODR"},
+    },
+    "day_mixed": {
+        "day": "Monday",
+        "inclusions": {"odr_low_touch_time_bucket": "RDR"},
+        "exclusions": {"adr_idr_midline_touch_time_bucket": ["RDR", "ODR"]},
+    },
+    "heavy": {
+        "day": "Friday",
+        "date_range": ("2012-01-01", "2022-12-31"),
+        "inclusions": {
+            "adr_high_touch_time_bucket": "ODR",
+            "prev_rdr_low_touch_time_bucket": "Untouched",
+        },
+        "exclusions": {
+            "odr_high_touch_time_bucket": ["RDR"],
+            "adr_low_touch_time_bucket": ["ODR", "RDR"],
+            "odr_idr_midline_touch_time_bucket": ["Untouched"],
+        },
+    },
+}
+
+CHART_CATEGORIES = list(schema.LABEL_DTYPE.categories)
+
+
+def measure(fn, repeats: int = 5) -> dict:
+    """Median/min seconds over ``repeats`` timed runs, and peak traced MB."""
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds": statistics.median(times),
+        "best": min(times),
+        "peak_mb": peak / 2**20,
+        "repeats": repeats,
+    }
+
+
+SCALED_COLUMNS = ["date"] + schema.BUCKET_COLUMNS
+
+
+def scale_frame(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Every session of ``df`` repeated ``factor`` times in a row.
+
+    Dates stay sorted and in range (1000x the history in distinct dates
+    would overflow datetime64[ns]), and every filter keeps the same
+    share of rows, so results are comparable across scales. Keeps only
+    what the filter and aggregate stages read, so 1000x stays within a
+    few hundred MB.
+    """
+    if factor == 1:
+        return df
+    return pd.DataFrame({
+        col: df[col].repeat(factor).to_numpy() if col == "date"
+        else pd.Categorical.from_codes(np.repeat(df[col].cat.codes.to_numpy(), factor),
+                                       dtype=df[col].dtype)
+        for col in SCALED_COLUMNS
+    })
+
+
+def synthetic_frame(instrument: str, n: int, seed: int = 0) -> pd.DataFrame:
+    """``n`` synthetic sessions learned from ``instrument`` (see synth.py), date-sorted."""
+    bucket_model, price_model = synth.fit([instrument])
+    parts = []
+    for i, start in enumerate(range(0, n, synth.MAX_SESSIONS)):
+        raw = synth.generate(bucket_model, price_model, instrument,
+                             min(synth.MAX_SESSIONS, n - start), seed=seed + i)
+        parts.append(synth.prepared(raw)[SCALED_COLUMNS])
+    df = pd.concat(parts, ignore_index=True)
+    return df.sort_values("date", kind="stable", ignore_index=True)
+
+
+def legacy_filter(df: pd.DataFrame, day: str = "All", date_range=None,
+                  inclusions=None, exclusions=None) -> pd.DataFrame:
+    """The original script's chained filters."""
+    out = df.copy()
+    if day != "All":
+        out = out[(out["date"] + pd.Timedelta(days=1)).dt.day_name() == day]
+    if date_range is not None:
+        out = out[(out["date"] >= pd.to_datetime(date_range[0]))
+                  & (out["date"] <= pd.to_datetime(date_range[1]))]
+    for col, sel in (inclusions or {}).items():
+        out = out[out[col] == sel]
+    for col, excludes in (exclusions or {}).items():
+        out = out[~out[col].isin(excludes)]
+    return out
+
+
+def legacy_value_counts(df: pd.DataFrame) -> dict:
+    return {col: df[col].value_counts(normalize=True) * 100 for col in schema.BUCKET_COLUMNS}
+
+
+def legacy_bar_figures(dist: dict) -> list:
+    figs = []
+    for col, counts in dist.items():
+        counts = counts.reindex(CHART_CATEGORIES, fill_value=0)
+        figs.append(px.bar(
+            x=counts.index, y=counts.values,
+            text=[f"{v:.1f}%" for v in counts.values],
+            labels={"x": "", "y": "% of Sessions"}, title=col,
+        ))
+    return figs
+
+
+def load_benchmarks(instrument: str) -> dict:
+    csv = data_store.csv_path(instrument)
+    raw = pd.read_csv(csv)
+    typed = schema.read_csv(csv)
+    data_store.load_instrument(instrument)  # make sure the store is built
+    return {
+        "load_csv_raw": lambda: pd.read_csv(csv),
+        "load_csv_typed": lambda: schema.read_csv(csv),
+        "load_store": lambda: data_store.load_instrument(instrument),
+        "label_replace": lambda: raw.replace(schema.BUCKET_LABELS),
+        "label_prepare": lambda: ingest.prepare(typed),
+        "date_parse": lambda: pd.to_datetime(raw["session_date"]),
+    }
+
+
+def filter_benchmarks(df: pd.DataFrame, mix: dict) -> dict:
+    index = bitmap_index.BitmapIndex(df)
+    codes = aggregate.bucket_codes(df)
+    mask = filters.build_mask(df, **mix)
+    filtered = legacy_filter(df, **mix)
+    return {
+        "filter_chained": lambda: legacy_filter(df, **mix),
+        "filter_mask": lambda: filters.build_mask(df, **mix),
+        "filter_bitmap": lambda: index.count(index.query(**mix)),
+        "aggregate_value_counts": lambda: legacy_value_counts(filtered),
+        "aggregate_bincount": lambda: aggregate.bucket_distributions(codes, mask),
+    }
+
+
+def render_benchmarks(df: pd.DataFrame) -> dict:
+    codes = aggregate.bucket_codes(df)
+    dist, _ = aggregate.bucket_distributions(codes)
+    legacy_dist = legacy_value_counts(df)
+    builder = charts.BarChartBuilder(CHART_CATEGORIES)
+
+    def reuse():
+        for col in schema.BUCKET_COLUMNS:
+            builder.figure(col, dist.loc[col].values)
+
+    return {
+        "render_px_bar": lambda: legacy_bar_figures(legacy_dist),
+        "render_reuse": reuse,
+    }
+
+
+def run(instrument: str = "ES", scales=(1, 10, 100), repeats: int = 5,
+        stages=("load", "filter", "render"), synthetic: bool = False,
+        log=print) -> list[dict]:
+    results = []
+    data = "synthetic" if synthetic else "repeated"
+
+    def record(name, fn, **labels):
+        entry = {"stage": name, **labels, **measure(fn, repeats)}
+        results.append(entry)
+        log(f"{name:24} {labels.get('scale', 1):>5}x {labels.get('mix', '-'):14}"
+            f" {entry['seconds'] * 1e3:10.3f} ms {entry['peak_mb']:9.1f} MB")
+
+    if "load" in stages:
+        for name, fn in load_benchmarks(instrument).items():
+            record(name, fn, scale=1, mix="-")
+
+    base = data_store.load_instrument(instrument)
+    if "filter" in stages:
+        for scale in scales:
+            if synthetic:
+                df = synthetic_frame(instrument, len(base) * scale)
+            else:
+                df = scale_frame(base, scale)
+            for mix_name, mix in MIXES.items():
+                for name, fn in filter_benchmarks(df, mix).items():
+                    record(name, fn, scale=scale, mix=mix_name, data=data)
+            del df
+
+    if "render" in stages:
+        for name, fn in render_benchmarks(base).items():
+            record(name, fn, scale=1, mix="-")
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=data_store.DATA_DIR,
+                             capture_output=True, text=True, timeout=10)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def read_history(path: Path = HISTORY_PATH) -> list[dict]:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def append_history(run_entry: dict, path: Path = HISTORY_PATH) -> None:
+    history = read_history(path)
+    history.append(run_entry)
+    data_store._atomic_write_bytes(path, json.dumps(history, indent=1).encode())
+
+
+def compare_with_previous(results: list[dict], history: list[dict], instrument: str) -> list[str]:
+    """One line per benchmark that also ran in the latest earlier run."""
+    previous = next((r for r in reversed(history) if r.get("instrument") == instrument), None)
+    if previous is None:
+        return []
+    key = lambda r: (r["stage"], r["scale"], r["mix"], r.get("data"))
+    before = {key(r): r for r in previous["results"]}
+    lines = []
+    for r in results:
+        old = before.get(key(r))
+        if old and old["seconds"] > 0:
+            ratio = r["seconds"] / old["seconds"]
+            lines.append(f"{r['stage']:24} {r['scale']:>5}x {r['mix']:14} "
+                         f"{ratio:6.2f}x vs {previous['commit'] or previous['timestamp']}")
+    return lines
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's stages")
+    parser.add_argument("--instrument", default="ES")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="scale factors for the filter/aggregate stages, e.g. 1 10 100 1000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--stages", nargs="+", choices=["load", "filter", "render"],
+                        default=["load", "filter", "render"])
+    parser.add_argument("--synthetic", action="store_true",
+                        help="scale with synth.py sessions instead of repeating the real ones")
+    parser.add_argument("--history", type=Path, default=HISTORY_PATH)
+    parser.add_argument("--no-save", action="store_true", help="do not append to the history")
+    args = parser.parse_args()
+
+    results = run(args.instrument, args.scales, args.repeats, args.stages, args.synthetic)
+    entry = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "instrument": args.instrument,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    history = read_history(args.history)
+    for line in compare_with_previous(results, history, args.instrument):
+        print(line)
+    if not args.no_save:
+        append_history(entry, args.history)
+        print(f"appended to {args.history}")
@@ -0,0 +1,94 @@
+"""Packed bitmap index over the touch-time buckets.
+
+Every bucket column has 7 categories, so each (column, category) pair
+gets one packed bitmap with a bit per session. Day of week gets one
+bitmap per weekday, and the date range becomes a contiguous bit range
+because sessions are stored in date order. Any combination of the
+dashboard filters then reduces to AND/OR/NOT over a few hundred bytes
+plus a popcount, whatever the number of sessions.
+"""
+import numpy as np
+import pandas as pd
+
+import filters
+import schema
+
+# number of set bits in every possible byte
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray) -> int:
+    return int(_POPCOUNT[bits].sum(dtype=np.int64))
+
+
+class BitmapIndex:
+    """Bitmaps for one prepared dataset (see ingest.prepare)."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self.all = np.packbits(np.ones(self.n, dtype=bool))
+
+        # one row per category, plus a trailing row for missing values
+        self.buckets = {}
+        n_labels = len(schema.LABEL_DTYPE.categories)
+        for col in schema.BUCKET_COLUMNS:
+            codes = df[col].cat.codes.to_numpy()
+            self.buckets[col] = np.stack(
+                [np.packbits(codes == k) for k in range(n_labels)]
+                + [np.packbits(codes == -1)]
+            )
+
+        dow = filters.day_of_week_codes(df["date"])
+        self.days = np.stack([np.packbits(dow == k) for k in range(7)])
+
+        self.dates = df["date"].to_numpy()
+        self.is_sorted = bool(np.all(self.dates[1:] >= self.dates[:-1]))
+
+    def _range(self, start: int, stop: int) -> np.ndarray:
+        # packed bits set for rows [start, stop), built byte-wise
+        bits = np.zeros_like(self.all)
+        if start >= stop:
+            return bits
+        first, last = start // 8, (stop - 1) // 8
+        bits[first:last + 1] = 0xFF
+        bits[first] &= 0xFF >> (start % 8)
+        bits[last] &= (0xFF << (7 - (stop - 1) % 8)) & 0xFF
+        return bits
+
+    def date_bits(self, start, end) -> np.ndarray:
+        lo = np.datetime64(pd.Timestamp(start))
+        hi = np.datetime64(pd.Timestamp(end))
+        if not self.is_sorted:
+            return np.packbits((self.dates >= lo) & (self.dates <= hi))
+        return self._range(
+            int(np.searchsorted(self.dates, lo, side="left")),
+            int(np.searchsorted(self.dates, hi, side="right")),
+        )
+
+    def query(self,
+              day: str = "All",
+              date_range: tuple | None = None,
+              inclusions: dict | None = None,
+              exclusions: dict | None = None) -> np.ndarray:
+        """Packed bitmap of the sessions matching the filters.
+
+        Takes the same arguments as filters.build_mask.
+        """
+        bits = self.all.copy()
+        if day != "All":
+            bits &= self.days[filters.DAY_NAMES.index(day)]
+        if date_range is not None:
+            bits &= self.date_bits(*date_range)
+        for col, allowed in filters.compile_bucket_filters(inclusions, exclusions).items():
+            bits &= np.bitwise_or.reduce(self.buckets[col][allowed], axis=0)
+        return bits
+
+    def count(self, bits: np.ndarray) -> int:
+        return popcount(bits)
+
+    def to_mask(self, bits: np.ndarray) -> np.ndarray:
+        return np.unpackbits(bits, count=self.n).astype(bool)
+
+    def mask(self, **kwargs) -> np.ndarray:
+        """Boolean row mask, equivalent to ``filters.build_mask(df, **kwargs)``."""
+        return self.to_mask(self.query(**kwargs))
@@ -0,0 +1,97 @@
+"""Bar-chart construction for the distribution grid.
+
+Building a figure with plotly express takes tens of milliseconds, and the
+dashboard draws 15 of them on every rerun. Only the bar heights and
+labels actually change, so each chart's figure is built once and later
+reruns just swap its y/text arrays in place (well under a millisecond).
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+
+class BarChartBuilder:
+    """Reusable bar figures, one per chart title.
+
+    The figures are mutated in place, so keep one builder per Streamlit
+    session (e.g. in ``st.session_state``) rather than sharing it.
+    """
+
+    def __init__(self, categories: list[str]):
+        self.categories = list(categories)
+        self._figures = {}
+
+    def _build(self, title: str) -> go.Figure:
+        zeros = np.zeros(len(self.categories))
+        fig = px.bar(
+            x=self.categories,
+            y=zeros,
+            text=[f"{v:.1f}%" for v in zeros],
+            labels={"x": "", "y": "% of Sessions"},
+            title=title,
+        )
+        fig.update_traces(textposition="outside")
+        fig.update_layout(
+            xaxis={"categoryorder": "array", "categoryarray": self.categories},
+            margin=dict(l=10, r=10, t=30, b=10),
+        )
+        return fig
+
+    def figure(self, title: str, values) -> go.Figure:
+        """The figure for ``title`` showing ``values`` (percentages, category order)."""
+        fig = self._figures.get(title)
+        if fig is None:
+            fig = self._figures[title] = self._build(title)
+
+        values = np.asarray(values, dtype=float)
+        with fig.batch_update():
+            fig.data[0].y = values
+            fig.data[0].text = [f"{v:.1f}%" for v in values]
+        return fig
+
+
+def grouped_bar_figure(title: str, categories: list[str], series: dict) -> go.Figure:
+    """Grouped bars, one trace per ``{name: percentages}`` entry."""
+    fig = go.Figure(
+        [
+            go.Bar(
+                name=name,
+                x=categories,
+                y=values,
+                text=[f"{v:.1f}%" for v in values],
+                textposition="outside",
+            )
+            for name, values in series.items()
+        ]
+    )
+    fig.update_layout(
+        title=title,
+        barmode="group",
+        yaxis_title="% of Sessions",
+        xaxis={"categoryorder": "array", "categoryarray": categories},
+        margin=dict(l=10, r=10, t=30, b=10),
+        legend=dict(orientation="h"),
+    )
+    return fig
+
+
+def heatmap_figure(title: str, percent: np.ndarray, x: list[str], y: list[str]) -> go.Figure:
+    """Annotated heatmap of a (len(y) x len(x)) percentage matrix."""
+    fig = go.Figure(
+        go.Heatmap(
+            z=percent,
+            x=x,
+            y=y,
+            zmin=0,
+            zmax=100,
+            colorscale="Blues",
+            texttemplate="%{z:.1f}%",
+            hovertemplate="%{y} → %{x}: %{z:.1f}%<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title=title,
+        yaxis={"autorange": "reversed"},
+        margin=dict(l=10, r=10, t=30, b=10),
+    )
+    return fig
@@ -0,0 +1,284 @@
+"""Local columnar store for the Session_Hits datasets.
+
+The processed CSVs ship with the repo. The first load of an instrument
+runs its CSV through the ingest stage into a Parquet file under
+``store/`` and records the CSV's sha256 in ``store/manifest.json``.
+Later loads read the Parquet file directly and only re-convert when the
+CSV content changes.
+Pulling fresh CSVs from GitHub is an explicit, optional sync step.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+import pandas as pd
+
+import ingest
+import instruments
+import schema
+
+DATA_DIR = Path(__file__).resolve().parent
+STORE_DIR = DATA_DIR / "store"
+MANIFEST_PATH = STORE_DIR / "manifest.json"
+
+REMOTE_BASE = "https://raw.githubusercontent.com/TuckerArrants/sessions/main"
+
+# bump whenever the on-disk conversion changes so old stores get rebuilt
+STORE_FORMAT = 4
+
+# serializes manifest read-modify-write when instruments build concurrently
+_manifest_lock = threading.Lock()
+
+INSTRUMENTS = ["ES", "NQ", "YM", "CL", "GC", "NG", "HG", "SI", "E6", "FDAX"]
+
+
+CSV_SUFFIX = "_Session_Hits_With_Mids_Processed_from_2008.csv"
+
+
+def csv_path(instrument: str) -> Path:
+    return DATA_DIR / f"{instrument}{CSV_SUFFIX}"
+
+
+def local_instruments() -> list[str]:
+    """INSTRUMENTS, then any synthetic instruments (synth.py) next to them."""
+    synthetic = []
+    for path in sorted(DATA_DIR.glob(f"*.*{CSV_SUFFIX}")):
+        name = path.name[:-len(CSV_SUFFIX)]
+        try:
+            instruments.spec(name)
+        except KeyError:
+            continue
+        synthetic.append(name)
+    return INSTRUMENTS + synthetic
+
+
+def store_path(instrument: str) -> Path:
+    return STORE_DIR / f"{instrument}.parquet"
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def read_manifest() -> dict:
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _write_manifest(manifest: dict) -> None:
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode()
+    _atomic_write_bytes(MANIFEST_PATH, data)
+
+
+def _write_parquet(df: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def is_current(instrument: str, manifest: dict | None = None) -> bool:
+    """True if the stored Parquet file matches the shipped CSV."""
+    if manifest is None:
+        manifest = read_manifest()
+    entry = manifest.get(instrument)
+    if not entry or entry.get("format") != STORE_FORMAT:
+        return False
+    if not store_path(instrument).exists():
+        return False
+    return entry.get("sha256") == file_sha256(csv_path(instrument))
+
+
+def build_instrument(instrument: str, timings: dict | None = None) -> dict:
+    """Convert one instrument's CSV into the store and update the manifest.
+
+    The seconds per ingest step are kept in the manifest entry and, if
+    given, in ``timings``.
+    """
+    steps = {}
+    src = csv_path(instrument)
+    digest = file_sha256(src)
+    df = ingest.ingest_csv(src, steps)
+    t0 = time.perf_counter()
+    _write_parquet(df, store_path(instrument))
+    steps["write store"] = time.perf_counter() - t0
+    if timings is not None:
+        timings.update(steps)
+
+    return _record(instrument, digest, len(df), steps)
+
+
+def _record(instrument: str, digest: str, rows: int, timings: dict | None = None) -> dict:
+    """Store the manifest entry, bumping the version when the data changed."""
+    with _manifest_lock:
+        manifest = read_manifest()
+        old = manifest.get(instrument, {})
+        version = old.get("version", 0)
+        if old.get("sha256") != digest:
+            version += 1
+        entry = {
+            "source": csv_path(instrument).name,
+            "sha256": digest,
+            "format": STORE_FORMAT,
+            "rows": rows,
+            "version": version,
+        }
+        if timings:
+            # pairs, so the step order survives the sorted manifest keys
+            entry["timings"] = [[step, round(s, 6)] for step, s in timings.items()]
+        manifest[instrument] = entry
+        _write_manifest(manifest)
+    return entry
+
+
+def csv_bytes(rows: pd.DataFrame, header: bool = True, start: int = 0) -> bytes:
+    """Raw-schema rows formatted like the shipped CSVs, numbered from ``start``."""
+    out = rows.copy()
+    out["session_date"] = out["session_date"].dt.strftime("%Y-%m-%d")
+    out.index = range(start, start + len(out))
+    return out.to_csv(header=header).encode()
+
+
+def write_csv(instrument: str, rows: pd.DataFrame) -> None:
+    """Replace an instrument's CSV with ``rows`` and rebuild its store."""
+    _atomic_write_bytes(csv_path(instrument), csv_bytes(schema.enforce(rows)))
+    build_instrument(instrument)
+
+
+def append_sessions(instrument: str, rows: pd.DataFrame) -> dict:
+    """Append new raw-schema session rows to an instrument's CSV and store.
+
+    The CSV is the source of truth, so it is swapped in first (via a
+    temp file and os.replace), then the Parquet file, then the manifest
+    with a new version. If the process dies after the CSV swap, its hash
+    no longer matches the manifest and the next load rebuilds the store
+    from the CSV, with a new version; if it dies before, nothing changed.
+    """
+    rows = schema.enforce(rows)
+    stored = load_instrument(instrument)
+    src = csv_path(instrument)
+
+    with open(src, "rb") as f:
+        data = f.read()
+    if data and not data.endswith(b"\n"):
+        data += b"\n"
+    data += csv_bytes(rows, header=False, start=len(stored))
+
+    combined = pd.concat([stored, ingest.prepare(rows, instrument)], ignore_index=True)
+    _atomic_write_bytes(src, data)
+    _write_parquet(combined, store_path(instrument))
+    return _record(instrument, hashlib.sha256(data).hexdigest(), len(combined))
+
+
+def load_instrument(instrument: str, timings: dict | None = None) -> pd.DataFrame:
+    """Load an instrument from the local store, converting its CSV if needed.
+
+    ``timings``, if given, gets the seconds per ingest step when the store
+    had to be (re)built, and always the seconds spent reading the store.
+    """
+    if not csv_path(instrument).exists() and not store_path(instrument).exists():
+        raise FileNotFoundError(f"No data for instrument {instrument!r}")
+    if csv_path(instrument).exists() and not is_current(instrument):
+        build_instrument(instrument, timings)
+    t0 = time.perf_counter()
+    df = schema.enforce(pd.read_parquet(store_path(instrument)), prepared=True)
+    if timings is not None:
+        timings["read store"] = time.perf_counter() - t0
+    return df
+
+
+def build_timings(instrument: str) -> dict:
+    """Seconds per ingest step of the instrument's last store build, if recorded."""
+    return dict(read_manifest().get(instrument, {}).get("timings", []))
+
+
+def source_stamp(instrument: str) -> tuple | None:
+    """Cheap change marker for an instrument's data: (mtime_ns, size) of its
+    CSV, or of the store file when only that exists; None if neither does.
+
+    Every writer in this repo replaces the CSV atomically, so any data
+    update changes the stamp without hashing the file.
+    """
+    for path in (csv_path(instrument), store_path(instrument)):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        return (st.st_mtime_ns, st.st_size)
+    return None
+
+
+def data_version(instrument: str) -> str:
+    """Identifier of the stored data, for keying downstream caches."""
+    entry = read_manifest().get(instrument, {})
+    return f"{entry.get('format')}-{entry.get('version', 0)}-{entry.get('sha256', '')[:16]}"
+
+
+def build_all(instruments: list[str] = INSTRUMENTS) -> dict:
+    return {inst: build_instrument(inst) for inst in instruments}
+
+
+def sync_from_remote(instrument: str, base: str = REMOTE_BASE) -> bool:
+    """Download the latest CSV for an instrument from ``base``.
+
+    Returns True if the local CSV changed (and the store was rebuilt).
+    """
+    url = f"{base}/{csv_path(instrument).name}"
+    with urllib.request.urlopen(url, timeout=30) as resp:
+        data = resp.read()
+
+    dest = csv_path(instrument)
+    if dest.exists() and hashlib.sha256(data).hexdigest() == file_sha256(dest):
+        return False
+    _atomic_write_bytes(dest, data)
+    build_instrument(instrument)
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or sync the local data store")
+    parser.add_argument("instruments", nargs="*", default=INSTRUMENTS)
+    parser.add_argument("--sync", action="store_true",
+                        help="pull the CSVs from GitHub before building")
+    args = parser.parse_args()
+
+    for inst in args.instruments:
+        if args.sync:
+            changed = sync_from_remote(inst)
+            print(f"{inst}: {'updated' if changed else 'unchanged'}")
+        elif not is_current(inst):
+            entry = build_instrument(inst)
+            print(f"{inst}: built {entry['rows']:,} rows")
+        else:
+            print(f"{inst}: up to date")
@@ -0,0 +1,104 @@
+"""A loaded instrument together with the structures the dashboard queries.
+
+Datasets are loaded once per process and shared by every Streamlit
+session (see preload.py and app.py), so they are read-only: the frame's
+column buffers and the query arrays are frozen, and sessions that want
+to derive columns work on ``view()``, which shares the buffers
+copy-on-write (pandas 3) instead of copying. A write that would reach
+the shared buffers raises instead.
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import aggregate
+import bitmap_index
+import data_store
+
+
+def _read_only(values: np.ndarray) -> np.ndarray:
+    values = np.array(values, copy=True)  # owned, so the flag sticks
+    values.flags.writeable = False
+    return values
+
+
+def frozen_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """``frame`` rebuilt on read-only column buffers."""
+    columns = {}
+    for col in frame.columns:
+        s = frame[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            columns[col] = pd.Categorical.from_codes(_read_only(s.cat.codes.to_numpy()),
+                                                     dtype=s.dtype)
+        elif isinstance(s.array, pd.arrays.IntegerArray):
+            data = s.to_numpy(dtype=s.dtype.numpy_dtype, na_value=0)
+            columns[col] = pd.arrays.IntegerArray(_read_only(data), _read_only(s.isna().to_numpy()))
+        else:
+            columns[col] = _read_only(s.to_numpy())
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+@dataclass
+class Dataset:
+    instrument: str
+    version: str
+    frame: pd.DataFrame
+    codes: np.ndarray
+    index: bitmap_index.BitmapIndex
+
+    # seconds per load step, for the profiling panel
+    timings: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, instrument: str) -> "Dataset":
+        # the ingest steps (date parsing, label mapping, ...) only run when
+        # the store has to be rebuilt from the CSV; otherwise those of the
+        # last build are reported, marked as such
+        timings = {}
+        frame = data_store.load_instrument(instrument, timings)
+        if "read csv" not in timings:
+            timings = {f"{step} (last build)": s
+                       for step, s in data_store.build_timings(instrument).items()} | timings
+        t0 = time.perf_counter()
+        frame = frozen_frame(frame)
+        t1 = time.perf_counter()
+        codes = aggregate.bucket_codes(frame)
+        t2 = time.perf_counter()
+        index = bitmap_index.BitmapIndex(frame)
+        t3 = time.perf_counter()
+        dataset = cls(
+            instrument=instrument,
+            version=data_store.data_version(instrument),
+            frame=frame,
+            codes=codes,
+            index=index,
+            timings=timings | {"freeze": t1 - t0, "bucket codes": t2 - t1,
+                               "bitmap index": t3 - t2},
+        )
+        dataset.freeze()
+        return dataset
+
+    def _arrays(self) -> list[np.ndarray]:
+        idx = self.index
+        return [self.codes, idx.all, idx.days, idx.dates, *idx.buckets.values()]
+
+    def freeze(self) -> None:
+        """Make the shared arrays read-only, so a stray write raises.
+
+        The frame is frozen when it is built (frozen_frame).
+        """
+        for arr in self._arrays():
+            arr.flags.writeable = False
+
+    def view(self) -> pd.DataFrame:
+        """A per-session frame that shares this dataset's column buffers."""
+        # pandas copy-on-write: no data is copied until a column is written
+        return self.frame.copy(deep=False)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum()) + sum(
+            arr.nbytes for arr in self._arrays()
+        )
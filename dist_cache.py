@@ -0,0 +1,104 @@
+"""Memoized bucket distributions keyed by normalized filter state.
+
+Users flip back and forth between the same handful of filter
+combinations. The key is a hash of (instrument, data version,
+normalized filters), so equivalent selections share an entry, e.g.
+exclusions picked in a different order. A bounded LRU holds the
+distribution table and sample size for each key. The cache is
+thread-safe so one instance can be shared by every Streamlit session.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def normalize_filters(day: str = "All",
+                      date_range: tuple | None = None,
+                      inclusions: dict | None = None,
+                      exclusions: dict | None = None) -> dict:
+    """Canonical, JSON-serializable form of a filter selection."""
+    state = {"day": day}
+    if date_range is not None:
+        start, end = date_range
+        state["date_range"] = [pd.Timestamp(start).date().isoformat(),
+                               pd.Timestamp(end).date().isoformat()]
+    state["inclusions"] = {
+        col: sel for col, sel in sorted((inclusions or {}).items()) if sel != "All"
+    }
+    state["exclusions"] = {
+        col: sorted(set(vals)) for col, vals in sorted((exclusions or {}).items()) if vals
+    }
+    return state
+
+
+def cache_key(instrument: str, version: str, filter_state: dict,
+              kind: str = "distributions") -> str:
+    """``kind`` separates different results computed for the same filters."""
+    payload = json.dumps(
+        {"instrument": instrument, "version": version, "filters": filter_state,
+         "kind": kind},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class LRUCache:
+    """Size-bounded least-recently-used cache with hit/miss counters."""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def lookup(self, key, compute) -> tuple:
+        """``(value, hit)`` for ``key``, calling ``compute()`` on a miss."""
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value, True
+        value = compute()
+        self.put(key, value)
+        return value, False
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for ``key``, calling ``compute()`` on a miss."""
+        return self.lookup(key, compute)[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
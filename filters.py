@@ -0,0 +1,111 @@
+"""Filter engine for the session dashboard.
+
+The sidebar/day/date selections and the 15 inclusion and 15 exclusion
+widgets are compiled into per-column lookup tables over the bucket
+category codes. ``build_mask`` then combines everything into a single
+boolean mask, so the frame is indexed once instead of once per filter.
+Nothing here depends on Streamlit.
+"""
+import numpy as np
+import pandas as pd
+
+import schema
+
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# map each filter to its column
+INCLUSION_MAP = {
+    "prev_rdr_high_touch_time_bucket":       "prdr_high_filter",
+    "pre_adr_high_touch_time_bucket":        "prdr_adr_transition_high_filter",
+    "adr_high_touch_time_bucket":            "adr_high_filter",
+    "adr_transition_high_touch_time_bucket": "adr_odr_transition_high_filter",
+    "odr_high_touch_time_bucket":            "odr_high_filter",
+    "odr_transition_high_touch_time_bucket": "odr_rdr_transition_high_filter",
+
+    "prev_rdr_low_touch_time_bucket":        "prdr_low_filter",
+    "pre_adr_low_touch_time_bucket":         "prdr_adr_transition_low_filter",
+    "adr_low_touch_time_bucket":             "adr_low_filter",
+    "adr_transition_low_touch_time_bucket":  "adr_odr_transition_low_filter",
+    "odr_low_touch_time_bucket":             "odr_low_filter",
+    "odr_transition_low_touch_time_bucket":  "odr_rdr_transition_low_filter",
+
+    "prev_rdr_idr_midline_touch_time_bucket": "prdr_mid_hit_filter",
+    "adr_idr_midline_touch_time_bucket":      "adr_mid_hit_filter",
+    "odr_idr_midline_touch_time_bucket":      "odr_mid_hit_filter",
+}
+
+EXCLUSION_MAP = {col: f"{key}_exclusion" for col, key in INCLUSION_MAP.items()}
+
+
+def selections_from_state(state) -> tuple[dict, dict]:
+    """Pull the active inclusions/exclusions out of a session-state mapping.
+
+    Returns ``({column: label}, {column: [labels]})`` with the "All" and
+    empty selections dropped.
+    """
+    inclusions = {}
+    for col, key in INCLUSION_MAP.items():
+        sel = state.get(key, "All")
+        if sel != "All":
+            inclusions[col] = sel
+
+    exclusions = {}
+    for col, key in EXCLUSION_MAP.items():
+        excludes = state.get(key) or []
+        if excludes:
+            exclusions[col] = list(excludes)
+    return inclusions, exclusions
+
+
+def compile_bucket_filters(inclusions: dict | None = None,
+                           exclusions: dict | None = None) -> dict:
+    """Compile selections into ``{column: allowed}`` lookup tables.
+
+    ``allowed`` has one entry per bucket category plus a trailing entry
+    for missing values, so indexing it with the category codes (-1 for
+    NaN) gives the row mask directly.
+    """
+    labels = list(schema.LABEL_DTYPE.categories)
+    tables = {}
+    for col in set(inclusions or {}) | set(exclusions or {}):
+        allowed = np.ones(len(labels) + 1, dtype=bool)
+        sel = (inclusions or {}).get(col)
+        if sel is not None:
+            allowed[:] = False
+            allowed[labels.index(sel)] = True
+        for label in (exclusions or {}).get(col, []):
+            allowed[labels.index(label)] = False
+        tables[col] = allowed
+    return tables
+
+
+def day_of_week_codes(dates: pd.Series) -> np.ndarray:
+    # sessions are dated by their evening open, so the trading day is +1
+    return ((dates.dt.dayofweek.to_numpy() + 1) % 7).astype(np.int8)
+
+
+def build_mask(df: pd.DataFrame,
+               day: str = "All",
+               date_range: tuple | None = None,
+               inclusions: dict | None = None,
+               exclusions: dict | None = None) -> np.ndarray:
+    """Boolean row mask for the given day, date range and bucket filters."""
+    mask = np.ones(len(df), dtype=bool)
+
+    if day != "All":
+        mask &= day_of_week_codes(df["date"]) == DAY_NAMES.index(day)
+
+    if date_range is not None:
+        start, end = date_range
+        dates = df["date"].to_numpy()
+        mask &= dates >= np.datetime64(pd.Timestamp(start))
+        mask &= dates <= np.datetime64(pd.Timestamp(end))
+
+    for col, allowed in compile_bucket_filters(inclusions, exclusions).items():
+        mask &= allowed[df[col].cat.codes.to_numpy()]
+    return mask
+
+
+def apply_filters(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """``df`` restricted to the rows selected by ``build_mask(df, **kwargs)``."""
+    return df[build_mask(df, **kwargs)]
@@ -0,0 +1,93 @@
+"""Contract specs for the ten instruments and integer price conversion.
+
+Prices are kept as integers everywhere past the CSV boundary: in the
+store, in the session engine and in the bar store. One price unit is
+half the instrument's data increment, so the IDR midlines (midpoints of
+two on-grid prices) are exact integers too. ``increment`` is the exchange
+tick, except where the historical data is quoted finer than today's
+tick (CL, GC, NG, HG, SI). Convert back to floats only for display.
+
+Synthetic instruments (synth.py) are named ``<source>.<name>``, e.g.
+``ES.SYN001``, and use their source's spec.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class InstrumentSpec:
+    symbol: str
+    name: str
+    exchange: str
+    tick_size: float   # exchange minimum price fluctuation
+    multiplier: float  # contract value per 1.0 price move
+    increment: float   # finest increment in the data
+
+    @property
+    def units_per_point(self) -> int:
+        """Integer price units per 1.0 of price."""
+        return int(round(2 / self.increment))
+
+    @property
+    def tick_value(self) -> float:
+        return self.tick_size * self.multiplier
+
+
+SPECS = {
+    spec.symbol: spec
+    for spec in [
+        InstrumentSpec("ES",   "E-mini S&P 500",    "CME",   0.25,    50,     0.25),
+        InstrumentSpec("NQ",   "E-mini Nasdaq-100", "CME",   0.25,    20,     0.25),
+        InstrumentSpec("YM",   "E-mini Dow",        "CBOT",  1.0,     5,      1.0),
+        InstrumentSpec("CL",   "Crude Oil",         "NYMEX", 0.01,    1000,   0.001),
+        InstrumentSpec("GC",   "Gold",              "COMEX", 0.1,     100,    0.01),
+        InstrumentSpec("NG",   "Natural Gas",       "NYMEX", 0.001,   10000,  0.0001),
+        InstrumentSpec("HG",   "Copper",            "COMEX", 0.0005,  25000,  0.0001),
+        InstrumentSpec("SI",   "Silver",            "COMEX", 0.005,   5000,   0.001),
+        InstrumentSpec("E6",   "Euro FX",           "CME",   0.00005, 125000, 0.00005),
+        InstrumentSpec("FDAX", "DAX Futures",       "Eurex", 0.5,     25,     0.5),
+    ]
+}
+
+
+def synthetic_symbol(source: str, name: str) -> str:
+    """Symbol of a synthetic instrument priced like ``source``."""
+    spec(source)
+    return f"{source}.{name}"
+
+
+def spec(symbol: str) -> InstrumentSpec:
+    if symbol in SPECS:
+        return SPECS[symbol]
+    source, dot, _ = symbol.partition(".")
+    if dot and source in SPECS:
+        base = SPECS[source]
+        return replace(base, symbol=symbol, name=f"Synthetic {base.name}")
+    raise KeyError(f"No instrument spec for {symbol!r}")
+
+
+def to_units(prices, symbol: str) -> pd.arrays.IntegerArray:
+    """Float prices -> nullable Int32 price units (NaN becomes <NA>).
+
+    Raises ValueError for prices whose units do not fit in Int32.
+    """
+    units = np.rint(np.asarray(prices, dtype=np.float64) * spec(symbol).units_per_point)
+    missing = np.isnan(units)
+    bounds = np.iinfo(np.int32)
+    out_of_range = ~missing & ((units < bounds.min) | (units > bounds.max))
+    if out_of_range.any():
+        name = getattr(prices, "name", None)
+        where = f" in {name!r}" if name is not None else ""
+        bad = np.asarray(prices, dtype=np.float64)[out_of_range][0]
+        raise ValueError(f"{symbol} price {bad!r}{where} is outside the Int32 unit range "
+                         f"({out_of_range.sum():,} values)")
+    return pd.arrays.IntegerArray(np.where(missing, 0, units).astype(np.int32), missing)
+
+
+def to_prices(units, symbol: str) -> np.ndarray:
+    """Price units -> float64 prices for display (<NA> becomes NaN)."""
+    values = pd.array(units, dtype="Int32").to_numpy(dtype=np.float64, na_value=np.nan)
+    # dividing by an integer gives the closest float to the decimal price
+    return values / spec(symbol).units_per_point
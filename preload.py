@@ -0,0 +1,76 @@
+"""Background preloading of every instrument.
+
+A Preloader starts loading all instruments on a thread pool as soon as
+it is created. ``get`` waits for one instrument if it is not ready yet.
+The Parquet reads and numpy work release the GIL, so threads give real
+overlap without pickling frames back from worker processes.
+
+``get`` also reloads an instrument whose source file changed since it
+was loaded (data_store.source_stamp), so a data update replaces only
+that instrument and nothing has to clear caches wholesale.
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import data_store
+from dataset import Dataset
+
+
+class Preloader:
+    def __init__(self, instruments: list[str], max_workers: int | None = None):
+        self.instruments = list(instruments)
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers or len(self.instruments),
+            thread_name_prefix="preload",
+        )
+        self._lock = threading.Lock()
+        self._futures: dict[str, Future] = {}
+        self._stamps: dict[str, tuple | None] = {}
+        for inst in self.instruments:
+            self._submit(inst)
+
+    def _submit(self, instrument: str) -> None:
+        # stamped before loading, so a change during the load triggers another
+        self._stamps[instrument] = data_store.source_stamp(instrument)
+        self._futures[instrument] = self._pool.submit(Dataset.load, instrument)
+
+    def _refresh(self, instrument: str) -> None:
+        with self._lock:
+            fut = self._futures.get(instrument)
+            if fut is None:
+                self._submit(instrument)
+            elif fut.done() and data_store.source_stamp(instrument) != self._stamps[instrument]:
+                self._submit(instrument)
+
+    def get(self, instrument: str, timeout: float | None = None) -> Dataset:
+        """The loaded dataset; re-raises the load error if loading failed."""
+        self._refresh(instrument)
+        return self._futures[instrument].result(timeout=timeout)
+
+    def status(self) -> dict[str, str]:
+        """``{instrument: "ready" | "loading" | "failed: <error>"}``."""
+        out = {}
+        for inst, fut in list(self._futures.items()):
+            if not fut.done():
+                out[inst] = "loading"
+            elif fut.exception() is not None:
+                out[inst] = f"failed: {fut.exception()}"
+            else:
+                out[inst] = "ready"
+        return out
+
+    def nbytes(self) -> int:
+        """Memory held by the loaded datasets."""
+        return sum(
+            fut.result().nbytes
+            for fut in list(self._futures.values())
+            if fut.done() and fut.exception() is None
+        )
+
+    def ready(self) -> bool:
+        return all(fut.done() for fut in list(self._futures.values()))
+
+    def wait(self) -> dict[str, str]:
+        for fut in list(self._futures.values()):
+            fut.exception()
+        return self.status()
@@ -0,0 +1,128 @@
+"""Opt-in per-rerun stage timing for the dashboard.
+
+A Profiler is created at the top of every rerun. ``stage(name)`` times a
+block of the script, ``cached`` records whether a cache lookup hit, and
+``note_frame`` records the size of a DataFrame the rerun produced. At
+the end, ``report`` gives the rows for the sidebar panel, and ``emit``
+writes the same data as one JSON log line on the ``sessions.profile``
+logger for aggregation. Unless something else has configured that
+logger, the first emit sends its lines to stderr, or appends them to the
+file named by SESSIONS_PROFILE_LOG. A disabled profiler does no timing
+or bookkeeping, so instrumenting the script costs nothing when it is
+off. Nothing here depends on Streamlit.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+import pandas as pd
+
+logger = logging.getLogger("sessions.profile")
+
+# set SESSIONS_PROFILE=1 to profile every rerun without the sidebar toggle
+ENV_FLAG = "SESSIONS_PROFILE"
+# JSON lines go to this file instead of stderr when set
+LOG_PATH_ENV = "SESSIONS_PROFILE_LOG"
+
+_logging_lock = threading.Lock()
+
+
+def enabled_by_env() -> bool:
+    return os.environ.get(ENV_FLAG, "") not in ("", "0")
+
+
+def configure_logging() -> None:
+    """Give the profile logger a JSON-lines handler if it has none yet.
+
+    Without one the records would go to the root logger, which drops
+    INFO by default (Streamlit included).
+    """
+    with _logging_lock:
+        if logger.handlers:
+            return
+        path = os.environ.get(LOG_PATH_ENV)
+        handler = logging.FileHandler(path) if path else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False, **context):
+        self.enabled = enabled
+        self.context = context
+        self.stages: list[dict] = []
+        self.caches: list[dict] = []
+        self.frames: list[dict] = []
+        self._start = time.perf_counter()
+
+    def stage(self, name: str):
+        """Context manager timing one named block of the rerun."""
+        if not self.enabled:
+            return nullcontext()
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({"stage": name, "ms": (time.perf_counter() - t0) * 1e3,
+                                "in_rerun": True})
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Record a timing measured outside this rerun, e.g. a background load."""
+        if self.enabled:
+            self.stages.append({"stage": name, "ms": seconds * 1e3, "in_rerun": False})
+
+    def cached(self, name: str, cache, key, compute):
+        """``cache.lookup(key, compute)``, recording a hit or a miss."""
+        value, hit = cache.lookup(key, compute)
+        if self.enabled:
+            self.caches.append({"cache": name, "hit": hit})
+        return value
+
+    def note_frame(self, name: str, df: pd.DataFrame, shared: bool = False) -> None:
+        """Record a frame's size; ``shared`` marks buffers owned by the dataset."""
+        if self.enabled:
+            self.frames.append({
+                "frame": name,
+                "rows": len(df),
+                "bytes": int(df.memory_usage(deep=True).sum()),
+                "shared": shared,
+            })
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._start) * 1e3
+
+    def report(self) -> pd.DataFrame:
+        """One row per stage with its time and share of the whole rerun.
+
+        Stages measured outside the rerun have no share.
+        """
+        total = self.total_ms
+        df = pd.DataFrame(self.stages, columns=["stage", "ms", "in_rerun"])
+        share = df["ms"] * 100 / total if total else 0.0
+        df["% of rerun"] = share.where(df["in_rerun"].astype(bool))
+        return df.drop(columns="in_rerun")
+
+    def record(self) -> dict:
+        return {
+            "event": "rerun",
+            **self.context,
+            "total_ms": round(self.total_ms, 3),
+            "stages": [{**s, "ms": round(s["ms"], 3)} for s in self.stages],
+            "caches": self.caches,
+            "frames": self.frames,
+        }
+
+    def emit(self) -> None:
+        if self.enabled:
+            configure_logging()
+            logger.info(json.dumps(self.record(), default=str))
@@ -0,0 +1,212 @@
+"""Headless access to the dashboard's filter and distribution logic.
+
+``query`` answers what the dashboard shows for one filter selection,
+without Streamlit: the 15 bucket distributions and the sample size.
+Datasets are loaded once per process and reloaded when their data
+changes (see preload.py), and results are memoized by normalized filter
+state (see dist_cache.py), so batches of thousands of scenarios mostly
+cost one bitmap query and one bincount each.
+
+    python query.py ES --day Monday --include adr_high=ODR --exclude odr_low=RDR,ODR
+    python query.py --batch scenarios.jsonl > results.jsonl
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import aggregate
+import dist_cache
+import filters
+import preload
+import schema
+from dataset import Dataset
+
+_registry: preload.Preloader | None = None
+_cache = dist_cache.LRUCache(maxsize=4096)
+
+
+def registry() -> preload.Preloader:
+    """Process-wide dataset registry, loading instruments on first use."""
+    global _registry
+    if _registry is None:
+        _registry = preload.Preloader([], max_workers=4)
+    return _registry
+
+
+def resolve_column(name: str) -> str:
+    """A bucket column from its full name or its level, e.g. ``adr_high``."""
+    for col in (name, f"{name}_touch_time_bucket"):
+        if col in schema.BUCKET_COLUMNS:
+            return col
+    raise ValueError(f"Unknown bucket column {name!r}")
+
+
+def resolve_label(name: str) -> str:
+    """A display label from itself or its raw bucket value, e.g. ``odr``."""
+    if name in schema.BUCKET_LABELS.values():
+        return name
+    if name in schema.BUCKET_LABELS:
+        return schema.BUCKET_LABELS[name]
+    raise ValueError(f"Unknown bucket {name!r}")
+
+
+def normalize(day: str = "All",
+              date_range: tuple | None = None,
+              inclusions: dict | None = None,
+              exclusions: dict | None = None) -> dict:
+    """dist_cache.normalize_filters, after resolving column and label names.
+
+    Raises TypeError for arguments of the wrong shape, e.g. from JSON.
+    """
+    if not isinstance(day, str):
+        raise TypeError(f"day must be a string, got {day!r}")
+    for name, value in (("inclusions", inclusions), ("exclusions", exclusions)):
+        if value is not None and not isinstance(value, dict):
+            raise TypeError(f"{name} must map columns to buckets, got {value!r}")
+    for col, labels in (exclusions or {}).items():
+        if not isinstance(labels, (list, tuple)):
+            raise TypeError(f"exclusions for {col!r} must be a list, got {labels!r}")
+    inclusions = {
+        resolve_column(col): label if label == "All" else resolve_label(label)
+        for col, label in (inclusions or {}).items()
+    }
+    exclusions = {
+        resolve_column(col): [resolve_label(label) for label in labels]
+        for col, labels in (exclusions or {}).items()
+    }
+    return dist_cache.normalize_filters(day, date_range, inclusions, exclusions)
+
+
+def filter_mask(dataset: Dataset, filter_state: dict) -> np.ndarray:
+    """Row mask of ``dataset`` for a normalized filter state."""
+    return dataset.index.mask(
+        day=filter_state["day"],
+        date_range=filter_state.get("date_range"),
+        inclusions=filter_state["inclusions"],
+        exclusions=filter_state["exclusions"],
+    )
+
+
+def distributions(dataset: Dataset, filter_state: dict) -> tuple[pd.DataFrame, int]:
+    """Bucket distributions and sample size for a normalized filter state."""
+    return aggregate.bucket_distributions(dataset.codes, filter_mask(dataset, filter_state))
+
+
+def query(instrument: str,
+          day: str = "All",
+          date_range: tuple | None = None,
+          inclusions: dict | None = None,
+          exclusions: dict | None = None) -> tuple[pd.DataFrame, int]:
+    """The dashboard's distributions for one instrument and filter selection.
+
+    Returns the percentage table (rows schema.BUCKET_COLUMNS, columns the
+    bucket labels) and the number of matching sessions. Raises ValueError
+    for unknown columns, buckets or days.
+    """
+    if day != "All" and day not in filters.DAY_NAMES:
+        raise ValueError(f"Unknown day {day!r}")
+    state = normalize(day, date_range, inclusions, exclusions)
+    dataset = registry().get(instrument)
+    key = dist_cache.cache_key(instrument, dataset.version, state)
+    return _cache.get_or_compute(key, lambda: distributions(dataset, state))
+
+
+def to_record(instrument: str, scenario: dict, table: pd.DataFrame, n: int) -> dict:
+    """JSON-serializable form of one query result."""
+    return {
+        "instrument": instrument,
+        "filters": scenario,
+        "sessions": n,
+        "distributions": {
+            col: {label: round(float(v), 4) for label, v in row.items()}
+            for col, row in table.iterrows()
+        },
+    }
+
+
+def run_batch(lines, instrument: str | None = None):
+    """One record per non-blank JSON line of scenarios, in order.
+
+    A line that cannot be parsed or queried yields an error record with
+    its line number instead of stopping the batch. ``instrument`` is the
+    default for lines without one.
+    """
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        scenario, inst = None, instrument
+        try:
+            scenario = json.loads(line)
+            if not isinstance(scenario, dict):
+                raise ValueError("Expected a JSON object")
+            inst = scenario.pop("instrument", instrument)
+            if not inst:
+                raise ValueError("No instrument given")
+            if not isinstance(inst, str):
+                raise TypeError(f"instrument must be a string, got {inst!r}")
+            table, n = query(inst, **scenario)
+        except (ValueError, TypeError, FileNotFoundError) as e:
+            # json.JSONDecodeError is a ValueError
+            yield {"line": lineno, "instrument": inst, "filters": scenario, "error": str(e)}
+            continue
+        yield to_record(inst, scenario, table, n)
+
+
+def _parse_pairs(items: list[str], multi: bool) -> dict:
+    out = {}
+    for item in items or []:
+        col, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"Expected COLUMN=BUCKET, got {item!r}")
+        out[col] = value.split(",") if multi else value
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Query session bucket distributions")
+    parser.add_argument("instrument", nargs="?", help="e.g. ES (or per line with --batch)")
+    parser.add_argument("--day", default="All")
+    parser.add_argument("--from", dest="start", help="first session date, YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="last session date, YYYY-MM-DD")
+    parser.add_argument("--include", action="append", metavar="COLUMN=BUCKET",
+                        help="keep sessions where COLUMN was touched in BUCKET")
+    parser.add_argument("--exclude", action="append", metavar="COLUMN=BUCKET[,BUCKET]",
+                        help="drop sessions where COLUMN was touched in any BUCKET")
+    parser.add_argument("--format", choices=["table", "json", "csv"], default="table")
+    parser.add_argument("--batch", type=argparse.FileType(),
+                        help="JSON lines of {instrument, day, date_range, inclusions, "
+                             "exclusions}; writes one JSON result per line")
+    args = parser.parse_args()
+
+    if args.batch:
+        for record in run_batch(args.batch, args.instrument):
+            print(json.dumps(record), flush=True)
+        sys.exit()
+
+    if not args.instrument:
+        parser.error("an instrument is required without --batch")
+    date_range = None
+    if args.start or args.end:
+        date_range = (args.start or "1900-01-01", args.end or "2100-01-01")
+    try:
+        scenario = {
+            "day": args.day,
+            "date_range": date_range,
+            "inclusions": _parse_pairs(args.include, multi=False),
+            "exclusions": _parse_pairs(args.exclude, multi=True),
+        }
+        table, n = query(args.instrument, **scenario)
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+
+    if args.format == "json":
+        print(json.dumps(to_record(args.instrument, scenario, table, n), indent=2))
+    elif args.format == "csv":
+        print(table.to_csv(float_format="%.4f"), end="")
+    else:
+        print(table.round(1).to_string())
+        print(f"Sample size: {n:,} sessions")
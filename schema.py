@@ -0,0 +1,143 @@
+"""Column schema for the Session_Hits datasets.
+
+Prices are float32 in the CSVs and nullable Int32 price units (see
+instruments.py) in the prepared frame the store holds. Touch timestamps
+are datetime64 and the touch-time buckets are an ordered Categorical in
+session order, so filters and counts work on small integer codes
+instead of strings.
+"""
+import time
+
+import pandas as pd
+
+# raw bucket values, in the same order as segment_order_with_no in app.py
+BUCKET_VALUES = [
+    "pre_adr",
+    "adr",
+    "adr_transition",
+    "odr",
+    "odr_transition",
+    "rdr",
+    "untouched",
+]
+BUCKET_DTYPE = pd.CategoricalDtype(BUCKET_VALUES, ordered=True)
+
+# display labels used by the dashboard
+BUCKET_LABELS = {
+    "pre_adr": "PRDR-ADR Transition",
+    "adr": "ADR",
+    "adr_transition": "ADR-ODR Transition",
+    "odr": "ODR",
+    "odr_transition": "ODR-RDR Transition",
+    "rdr": "RDR",
+    "untouched": "Untouched",
+}
+LABEL_DTYPE = pd.CategoricalDtype(
+    [BUCKET_LABELS[v] for v in BUCKET_VALUES], ordered=True
+)
+
+# session segments as minute windows from the 18:00 open, keyed by bucket value
+SEGMENT_WINDOWS = {
+    "pre_adr":        (   0,   90),
+    "adr":            (  90,  480),
+    "adr_transition": ( 480,  540),
+    "odr":            ( 540,  870),
+    "odr_transition": ( 870,  930),
+    "rdr":            ( 930, 1380),
+}
+
+SEGMENT_PREFIXES = [
+    "prev_rdr",
+    "pre_adr",
+    "adr",
+    "adr_transition",
+    "odr",
+    "odr_transition",
+    "rdr",
+]
+MIDLINE_PREFIXES = ["prev_rdr", "adr", "odr"]
+
+# session levels that get a first-touch time (rdr is the last segment)
+TOUCH_LEVELS = (
+    [f"{p}_{side}" for p in SEGMENT_PREFIXES[:-1] for side in ("high", "low")]
+    + [f"{p}_idr_midline" for p in MIDLINE_PREFIXES]
+)
+
+PRICE_COLUMNS = (
+    [f"{p}_{side}" for p in SEGMENT_PREFIXES for side in ("high", "low")]
+    + [f"{p}_idr_midline" for p in MIDLINE_PREFIXES]
+)
+TOUCH_COLUMNS = [f"{level}_touch" for level in TOUCH_LEVELS]
+BUCKET_COLUMNS = [f"{level}_touch_time_bucket" for level in TOUCH_LEVELS]
+
+COLUMNS = (
+    ["session_date"]
+    + PRICE_COLUMNS
+    + TOUCH_COLUMNS
+    + BUCKET_COLUMNS
+    + ["Instrument"]
+)
+
+DTYPES = {
+    "session_date": "datetime64[ns]",
+    **{c: "float32" for c in PRICE_COLUMNS},
+    **{c: "datetime64[ns]" for c in TOUCH_COLUMNS},
+    **{c: BUCKET_DTYPE for c in BUCKET_COLUMNS},
+    "Instrument": "category",
+}
+
+# schema of the prepared frame the store holds (see ingest.py)
+PREPARED_COLUMNS = COLUMNS + ["date"]
+PREPARED_DTYPES = {
+    **DTYPES,
+    **{c: "Int32" for c in PRICE_COLUMNS},
+    **{c: LABEL_DTYPE for c in BUCKET_COLUMNS},
+    "date": "datetime64[ns]",
+}
+
+
+def read_csv(path, timings: dict | None = None) -> pd.DataFrame:
+    """Read a Session_Hits CSV straight into the declared dtypes.
+
+    ``timings``, if given, gets the seconds spent reading and parsing dates.
+    """
+    t0 = time.perf_counter()
+    df = pd.read_csv(
+        path,
+        index_col=0,
+        dtype={c: t for c, t in DTYPES.items() if not str(t).startswith("datetime")},
+    )
+    t1 = time.perf_counter()
+    for col in ["session_date"] + TOUCH_COLUMNS:
+        df[col] = pd.to_datetime(df[col], format="ISO8601")
+    t2 = time.perf_counter()
+    if timings is not None:
+        timings.update({"read csv": t1 - t0, "date parsing": t2 - t1})
+    return enforce(df)
+
+
+def enforce(df: pd.DataFrame, prepared: bool = False) -> pd.DataFrame:
+    """Return ``df`` with exactly the schema columns, cast to their dtypes.
+
+    ``prepared`` selects the labelled schema of the stored frame instead of
+    the raw CSV one. Raises ValueError on missing columns or unknown bucket
+    values, rather than letting them turn into NaN.
+    """
+    columns = PREPARED_COLUMNS if prepared else COLUMNS
+    dtypes = PREPARED_DTYPES if prepared else DTYPES
+
+    missing = [c for c in columns if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    df = df[columns]
+    casts = {c: t for c, t in dtypes.items() if df[c].dtype != t}
+    for col in BUCKET_COLUMNS:
+        if col in casts:
+            allowed = dtypes[col].categories
+            unknown = set(df[col].dropna().unique()) - set(allowed)
+            if unknown:
+                raise ValueError(f"Unknown bucket values in {col}: {sorted(unknown)}")
+    if casts:
+        df = df.astype(casts)
+    return df.reset_index(drop=True)
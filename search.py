@@ -0,0 +1,100 @@
+"""Rank bucket conditions by how much they skew a target bucket.
+
+A condition is one inclusion filter (``column == bucket``) or a pair of
+them on different columns. For a target such as "ODR High touched in
+RDR", every single and pairwise condition is scored in one go: with the
+one-hot bucket matrix X and the target indicator y, ``X.sum(0)`` and
+``y @ X`` give each single condition's sample size and hits, and
+``X.T @ X`` and ``X.T @ (X * y)`` give the same for every pair. The
+matrix products run multithreaded in BLAS, so a full search over one
+instrument takes milliseconds.
+"""
+import numpy as np
+import pandas as pd
+
+import aggregate
+import schema
+
+LABELS = list(schema.LABEL_DTYPE.categories)
+RESULT_COLUMNS = ["column", "bucket", "column_2", "bucket_2", "sessions", "hits",
+                  "probability", "lift"]
+
+
+def rank_conditions(codes: np.ndarray,
+                    target_column: str,
+                    target_bucket: str,
+                    mask: np.ndarray | None = None,
+                    min_sessions: int = 30,
+                    pairs: bool = True) -> pd.DataFrame:
+    """Conditions ranked by lift on P(target), then by sample size.
+
+    ``mask`` restricts the base sessions (e.g. the dashboard filters);
+    sessions where the target column is missing never count. Conditions
+    on the target column itself are skipped, as are conditions met by
+    fewer than ``min_sessions`` sessions. ``probability`` is in percent,
+    ``lift`` is the probability over the base rate. Single conditions
+    have NaN ``column_2``/``bucket_2``.
+    """
+    t = schema.BUCKET_COLUMNS.index(target_column)
+    base = codes[:, t] >= 0
+    if mask is not None:
+        base &= mask
+
+    x = aggregate.one_hot(codes, base)
+    y = x[:, t * aggregate.N_LABELS + LABELS.index(target_bucket)]
+    if len(y) == 0 or not y.any():
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    base_rate = y.mean()
+
+    feature_col = np.repeat(np.arange(codes.shape[1]), aggregate.N_LABELS)
+    feature_label = np.tile(np.arange(aggregate.N_LABELS), codes.shape[1])
+    usable = feature_col != t
+
+    first = np.flatnonzero(usable)
+    second = np.full(len(first), -1)
+    sessions = x.sum(axis=0)[first]
+    hits = (y @ x)[first]
+
+    if pairs:
+        i, j = np.triu_indices(x.shape[1], k=1)
+        keep = usable[i] & usable[j] & (feature_col[i] != feature_col[j])
+        i, j = i[keep], j[keep]
+        both = x.T @ x
+        both_hits = x.T @ (x * y[:, None])
+        first = np.r_[first, i]
+        second = np.r_[second, j]
+        sessions = np.r_[sessions, both[i, j]]
+        hits = np.r_[hits, both_hits[i, j]]
+
+    sessions = np.rint(sessions).astype(np.int64)
+    hits = np.rint(hits).astype(np.int64)
+    enough = sessions >= max(min_sessions, 1)
+    first, second, sessions, hits = first[enough], second[enough], sessions[enough], hits[enough]
+
+    probability = hits / sessions
+    columns = np.array(schema.BUCKET_COLUMNS + [np.nan], dtype=object)
+    labels = np.array(LABELS + [np.nan], dtype=object)
+    result = pd.DataFrame({
+        "column": columns[feature_col[first]],
+        "bucket": labels[feature_label[first]],
+        "column_2": columns[np.where(second >= 0, feature_col[second], -1)],
+        "bucket_2": labels[np.where(second >= 0, feature_label[second], -1)],
+        "sessions": sessions,
+        "hits": hits,
+        "probability": probability * 100,
+        "lift": probability / base_rate,
+    })
+    return result.sort_values(["lift", "sessions"], ascending=False,
+                              kind="stable").reset_index(drop=True)
+
+
+def base_rate(codes: np.ndarray, target_column: str, target_bucket: str,
+              mask: np.ndarray | None = None) -> tuple[float, int]:
+    """P(target) in percent over the base sessions, and their number."""
+    target = codes[:, schema.BUCKET_COLUMNS.index(target_column)]
+    base = target >= 0
+    if mask is not None:
+        base &= mask
+    n = int(np.count_nonzero(base))
+    hits = int(np.count_nonzero(target[base] == LABELS.index(target_bucket)))
+    return (hits * 100 / n if n else 0.0), n
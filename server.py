@@ -0,0 +1,216 @@
+"""Local HTTP JSON service for the bucket distributions.
+
+A small stdlib-only asyncio server in front of query.py, for tools that
+want what the dashboard shows without driving Streamlit:
+
+    POST /distributions  {"instrument": "ES", "day": "Monday",
+                          "date_range": ["2020-01-01", "2024-12-31"],
+                          "inclusions": {"adr_high": "ODR"},
+                          "exclusions": {"odr_low": ["RDR"]}}
+    GET  /instruments    loaded instruments and their data versions
+    GET  /health
+
+The response body is query.to_record. Datasets stay resident in the
+query registry. Identical requests that arrive while one is being
+computed share its result instead of computing again, so a burst of the
+same query costs one computation. Connections are kept alive, and an
+answered query is a dict lookup in query's LRU, so one core serves
+hundreds of requests per second.
+
+    python server.py --port 8765
+"""
+import asyncio
+import json
+
+import data_store
+import query
+
+MAX_BODY = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class DistributionService:
+    def __init__(self, instruments: list[str] | None = None):
+        self.instruments = list(instruments or data_store.local_instruments())
+        self._inflight: dict[str, asyncio.Future] = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    def preload(self) -> None:
+        """Load every instrument up front; missing ones are skipped."""
+        for inst in self.instruments:
+            try:
+                query.registry().get(inst)
+            except FileNotFoundError:
+                pass
+
+    async def distributions(self, payload: dict) -> dict:
+        if not isinstance(payload, dict) or "instrument" not in payload:
+            raise HTTPError(400, "Expected a JSON object with an 'instrument'")
+        payload = dict(payload)
+        instrument = payload.pop("instrument")
+        if not isinstance(instrument, str):
+            raise HTTPError(400, "'instrument' must be a string")
+        # checked before the registry, which would keep a failed load per name
+        if instrument not in self.instruments and instrument not in data_store.local_instruments():
+            raise HTTPError(404, f"No data for instrument {instrument!r}")
+        unknown = set(payload) - {"day", "date_range", "inclusions", "exclusions"}
+        if unknown:
+            raise HTTPError(400, f"Unknown fields: {sorted(unknown)}")
+        try:
+            state = query.normalize(**payload)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, str(e)) from None
+
+        key = json.dumps([instrument, state], sort_keys=True)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            # off the event loop, in case the dataset has to be (re)loaded
+            table, n = await asyncio.to_thread(query.query, instrument, **payload)
+            self.computed += 1
+            result = query.to_record(instrument, payload, table, n)
+            fut.set_result(result)
+        except FileNotFoundError as e:
+            fut.set_exception(HTTPError(404, str(e)))
+        except (TypeError, ValueError) as e:
+            fut.set_exception(HTTPError(400, str(e)))
+        except Exception as e:
+            fut.set_exception(e)
+        finally:
+            del self._inflight[key]
+            if not fut.done():
+                # this request was cancelled; release the ones sharing it
+                fut.set_exception(HTTPError(503, "Computation was cancelled, retry"))
+                fut.exception()  # retrieved, even if nobody was waiting
+        return fut.result()
+
+    def instrument_versions(self) -> dict:
+        return {inst: data_store.data_version(inst) for inst in self.instruments}
+
+    async def handle(self, method: str, path: str, body: bytes) -> dict:
+        if path == "/health":
+            return {"status": "ok", "computed": self.computed, "coalesced": self.coalesced}
+        if path == "/instruments":
+            return self.instrument_versions()
+        if path == "/distributions":
+            if method != "POST":
+                raise HTTPError(405, "Use POST")
+            try:
+                payload = json.loads(body or b"null")
+            except json.JSONDecodeError as e:
+                raise HTTPError(400, f"Invalid JSON: {e}") from None
+            return await self.distributions(payload)
+        raise HTTPError(404, f"No route for {path}")
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    """(method, path, headers, body), or None when the client has closed."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "Bad Content-Length") from None
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def _response(status: int, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+def make_handler(service: DistributionService):
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = 200, await service.handle(method, path, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+    return handle_connection
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765,
+                service: DistributionService | None = None) -> asyncio.Server:
+    service = service or DistributionService()
+    return await asyncio.start_server(make_handler(service), host, port)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve bucket distributions over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-preload", action="store_true",
+                        help="load instruments on first request instead of at start")
+    args = parser.parse_args()
+
+    service = DistributionService()
+    if not args.no_preload:
+        service.preload()
+
+    async def main():
+        server = await serve(args.host, args.port, service)
+        print(f"serving on http://{args.host}:{args.port}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,285 @@
+"""Session processing engine: 5-minute OHLC bars -> Session_Hits rows.
+
+Sessions open at 18:00 exchange time on ``session_date`` and are split
+into the minute windows of schema.SEGMENT_WINDOWS. For every session
+the engine derives:
+
+- each segment's wick high/low, plus the previous session's RDR high/low
+  as ``prev_rdr_*``;
+- the IDR midlines of the ADR, ODR and previous RDR, i.e. the midpoint
+  of the segment's candle-body range (max/min of open and close);
+- the first bar after a level's segment closes (from the session open
+  for ``prev_rdr_*``) whose high reaches a high level, whose low reaches
+  a low level, or that has traded on both sides of a midline;
+- the segment that first touch falls in, or "untouched".
+
+Levels come from numpy group-by-session reductions over the whole bar
+array, and first touches from binary searches over running maxima (see
+TouchIndex); there is no per-bar or per-session Python loop. All of it
+runs on integer price units (instruments.py), so touch comparisons are
+exact; prices are converted back to floats only in the output frame.
+"""
+import numpy as np
+import pandas as pd
+
+import instruments
+import schema
+
+SESSION_OPEN = pd.Timedelta(hours=18)
+SESSION_MINUTES = max(end for _, end in schema.SEGMENT_WINDOWS.values())
+
+SEGMENT_KEYS = list(schema.SEGMENT_WINDOWS)
+SEGMENT_STARTS = np.array([start for start, _ in schema.SEGMENT_WINDOWS.values()])
+
+# (level, kind, search start minute); kind is "high", "low" or "mid"
+LEVELS = (
+    [("prev_rdr_high", "high", 0), ("prev_rdr_low", "low", 0)]
+    + [
+        (f"{seg}_{side}", side, schema.SEGMENT_WINDOWS[seg][1])
+        for seg in SEGMENT_KEYS[:-1]
+        for side in ("high", "low")
+    ]
+    + [
+        ("prev_rdr_idr_midline", "mid", 0),
+        ("adr_idr_midline", "mid", schema.SEGMENT_WINDOWS["adr"][1]),
+        ("odr_idr_midline", "mid", schema.SEGMENT_WINDOWS["odr"][1]),
+    ]
+)
+assert [name for name, _, _ in LEVELS] == schema.TOUCH_LEVELS
+
+BAR_COLUMNS = ["timestamp", "open", "high", "low", "close"]
+
+# level value for a segment without bars
+MISSING = np.iinfo(np.int64).min
+
+
+def load_bars(path) -> pd.DataFrame:
+    """Read a bar CSV with timestamp,open,high,low,close columns."""
+    return pd.read_csv(path, usecols=BAR_COLUMNS, parse_dates=["timestamp"])
+
+
+def session_clock(ts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Session date and minutes since the session open for each timestamp."""
+    ts = np.asarray(ts, dtype="datetime64[ns]")
+    session_dates = (ts - SESSION_OPEN.to_timedelta64()).astype("datetime64[D]")
+    minute = (
+        (ts - session_dates.astype("datetime64[ns]") - SESSION_OPEN.to_timedelta64())
+        // np.timedelta64(1, "m")
+    ).astype(np.int32)
+    return session_dates, minute
+
+
+class SessionBars:
+    """Bars sorted by time and tagged with session and segment ids.
+
+    ``bars`` is a DataFrame or a structured array (e.g. a bar_store
+    memmap) with BAR_COLUMNS fields. Float prices are converted to the
+    instrument's integer price units; integer prices are taken to be in
+    those units already.
+    """
+
+    def __init__(self, bars, instrument: str):
+        per_point = instruments.spec(instrument).units_per_point
+        ts = np.asarray(bars["timestamp"], dtype="datetime64[ns]")
+        order = slice(None)
+        if len(ts) and np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+
+        session_dates, minute = session_clock(ts[order])
+        # 17:00-18:00 is the daily maintenance break, outside every segment
+        keep = minute < SESSION_MINUTES
+
+        def prices(name):
+            values = np.asarray(bars[name])[order][keep]
+            if np.issubdtype(values.dtype, np.integer):
+                return values.astype(np.int64)
+            return np.rint(values.astype(np.float64) * per_point).astype(np.int64)
+
+        self.ts = ts[order][keep]
+        self.minute = minute[keep]
+        self.open = prices("open")
+        self.high = prices("high")
+        self.low = prices("low")
+        self.close = prices("close")
+
+        self.dates, self.session = np.unique(session_dates[keep], return_inverse=True)
+        self.segment = (np.searchsorted(SEGMENT_STARTS, self.minute, side="right") - 1).astype(np.int8)
+
+        # bars are time-sorted, so sessions are contiguous runs
+        self.starts = np.flatnonzero(np.diff(self.session, prepend=-1) != 0)
+        self.ends = np.r_[self.starts[1:], len(self.session)]
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.dates)
+
+
+def _segment_extremes(sb: SessionBars, values: np.ndarray, reduce) -> np.ndarray:
+    """(sessions x segments) reduction of ``values``, MISSING where a segment has no bars."""
+    out = np.full((sb.n_sessions, len(SEGMENT_KEYS)), MISSING)
+    if len(values) == 0:
+        return out
+    group = sb.session.astype(np.int64) * len(SEGMENT_KEYS) + sb.segment
+    starts = np.flatnonzero(np.r_[True, np.diff(group) != 0])
+    reduced = reduce.reduceat(values, starts)
+    np.put(out, group[starts], reduced)
+    return out
+
+
+def session_levels(sb: SessionBars) -> dict[str, np.ndarray]:
+    """Every level of schema.PRICE_COLUMNS as one value per session."""
+    highs = _segment_extremes(sb, sb.high, np.maximum)
+    lows = _segment_extremes(sb, sb.low, np.minimum)
+    body_highs = _segment_extremes(sb, np.maximum(sb.open, sb.close), np.maximum)
+    body_lows = _segment_extremes(sb, np.minimum(sb.open, sb.close), np.minimum)
+    # units are half the price increment, so on-grid midpoints are exact
+    mids = np.where((body_highs == MISSING) | (body_lows == MISSING),
+                    MISSING, (body_highs + body_lows) // 2)
+
+    def prev(values):
+        return np.r_[MISSING, values[:-1]][:len(values)]
+
+    rdr = SEGMENT_KEYS.index("rdr")
+    levels = {
+        "prev_rdr_high": prev(highs[:, rdr]),
+        "prev_rdr_low": prev(lows[:, rdr]),
+    }
+    for i, seg in enumerate(SEGMENT_KEYS):
+        levels[f"{seg}_high"] = highs[:, i]
+        levels[f"{seg}_low"] = lows[:, i]
+    levels["prev_rdr_idr_midline"] = prev(mids[:, rdr])
+    levels["adr_idr_midline"] = mids[:, SEGMENT_KEYS.index("adr")]
+    levels["odr_idr_midline"] = mids[:, SEGMENT_KEYS.index("odr")]
+    return levels
+
+
+class TouchIndex:
+    """Running session maxima for first-touch lookups by binary search.
+
+    For a search start minute, every bar's high is encoded as
+    ``session * span + (high - floor)``, with bars before the start
+    pinned to ``session * span``. The encoding keeps sessions in disjoint
+    ranges, so one ``np.maximum.accumulate`` over all bars is a
+    per-session running maximum that is globally non-decreasing. The
+    first bar of a session whose high reaches a level is then one
+    ``np.searchsorted`` away. Lows are handled the same way, negated.
+    The arrays are built once per (side, start) and shared by every
+    level, so extra levels cost O(log n) per session each.
+    """
+
+    def __init__(self, sb: SessionBars):
+        self.sb = sb
+        self._runs = {}
+        prices = np.r_[sb.high, -sb.low]
+        self.floor = prices.min() - 1 if len(prices) else 0
+        self.span = prices.max() - self.floor + 1 if len(prices) else 1
+        self.base = sb.session.astype(np.int64) * self.span
+
+    def _running(self, side: str, start: int) -> np.ndarray:
+        key = (side, start)
+        if key not in self._runs:
+            values = self.sb.high if side == "high" else -self.sb.low
+            enc = self.base + np.where(self.sb.minute >= start, values - self.floor, 0)
+            self._runs[key] = np.maximum.accumulate(enc) if len(enc) else enc
+        return self._runs[key]
+
+    def first(self, level: np.ndarray, side: str, start: int) -> np.ndarray:
+        """Bar index of each session's first high >= level (or low <= level), -1 if none."""
+        sb = self.sb
+        valid = level != MISSING
+        values = np.where(valid, level, 0)
+        if side == "low":
+            values = -values
+        sessions = np.arange(sb.n_sessions, dtype=np.int64)
+        # clipped so bars before ``start`` can never match
+        target = sessions * self.span + np.maximum(values - self.floor, 1)
+        # missing levels sort last, so they land past the session end
+        target[~valid] = np.iinfo(np.int64).max
+        idx = np.searchsorted(self._running(side, start), target, side="left")
+        return np.where(idx < sb.ends, idx, -1)
+
+
+def first_touch(index: TouchIndex, level: np.ndarray, kind: str, start: int) -> np.ndarray:
+    """Bar index of each session's first touch of ``level`` at or after minute ``start``."""
+    if kind in ("high", "low"):
+        return index.first(level, kind, start)
+
+    # a midline is touched once price has traded at or on both sides of it
+    above = index.first(level, "high", start)
+    below = index.first(level, "low", start)
+    return np.where((above >= 0) & (below >= 0), np.maximum(above, below), -1)
+
+
+def process_bars(bars, instrument: str) -> pd.DataFrame:
+    """Build the Session_Hits frame (raw schema) for one instrument's bars.
+
+    Takes anything SessionBars accepts.
+    """
+    sb = SessionBars(bars, instrument)
+    levels = session_levels(sb)
+    index = TouchIndex(sb)
+
+    out = {"session_date": sb.dates.astype("datetime64[ns]")}
+    for name, values in levels.items():
+        missing = values == MISSING
+        units = pd.arrays.IntegerArray(np.where(missing, 0, values).astype(np.int32), missing)
+        out[name] = instruments.to_prices(units, instrument)
+
+    segment_names = np.array(SEGMENT_KEYS + ["untouched"], dtype=object)
+    for name, kind, start in LEVELS:
+        idx = first_touch(index, levels[name], kind, start)
+        touched = idx >= 0
+        touch = np.full(sb.n_sessions, np.datetime64("NaT"), dtype="datetime64[ns]")
+        touch[touched] = sb.ts[idx[touched]]
+        bucket = np.full(sb.n_sessions, len(SEGMENT_KEYS))
+        bucket[touched] = sb.segment[idx[touched]]
+
+        out[f"{name}_touch"] = touch
+        out[f"{name}_touch_time_bucket"] = segment_names[bucket]
+
+    out["Instrument"] = instrument
+    return schema.enforce(pd.DataFrame(out))
+
+
+def compare_frames(generated: pd.DataFrame, reference: pd.DataFrame,
+                   instrument: str) -> pd.Series:
+    """Per-column share of sessions where ``generated`` matches ``reference``.
+
+    Sessions are aligned on ``session_date``; only dates present in both
+    frames count. Prices are compared exactly, in the instrument's price
+    units. NaN/NaT on both sides counts as a match.
+    """
+    merged = generated.merge(reference, on="session_date", suffixes=("", "_ref"))
+    rates = {}
+    for col in schema.PRICE_COLUMNS:
+        a = instruments.to_units(merged[col], instrument)
+        b = instruments.to_units(merged[f"{col}_ref"], instrument)
+        same = (a == b).fillna(False).to_numpy(bool) | (a.isna() & b.isna())
+        rates[col] = same.mean() if len(same) else np.nan
+    for col in schema.TOUCH_COLUMNS + schema.BUCKET_COLUMNS:
+        a, b = merged[col], merged[f"{col}_ref"]
+        same = (a.astype(object) == b.astype(object)) | (a.isna() & b.isna())
+        rates[col] = same.mean() if len(same) else np.nan
+    return pd.Series(rates, name=f"match rate ({len(merged):,} sessions)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import data_store
+
+    parser = argparse.ArgumentParser(description="Build Session_Hits rows from 5-minute bars")
+    parser.add_argument("bars", help="CSV with timestamp,open,high,low,close")
+    parser.add_argument("instrument")
+    parser.add_argument("--out", help="write the result to this CSV")
+    parser.add_argument("--check", action="store_true",
+                        help="compare against the shipped CSV for the instrument")
+    args = parser.parse_args()
+
+    result = process_bars(load_bars(args.bars), args.instrument)
+    print(f"{args.instrument}: {len(result):,} sessions")
+    if args.out:
+        result.to_csv(args.out)
+    if args.check:
+        shipped = schema.read_csv(data_store.csv_path(args.instrument))
+        print(compare_frames(result, shipped, args.instrument).to_string())
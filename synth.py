@@ -0,0 +1,269 @@
+"""Synthetic Session_Hits data for scale and load testing.
+
+Generated frames have exactly the raw schema (schema.COLUMNS) and are
+learned from the shipped files:
+
+- BucketModel links the 15 touch-time bucket columns in a tree that
+  keeps the strongest pairwise dependencies (a Chow-Liu tree over their
+  mutual information). Each column is drawn from its transition
+  probabilities given its tree parent and grandparent. The
+  probabilities are counted from the source data, so every column's
+  distribution is reproduced and impossible buckets (e.g. an ADR high
+  touched in the pre-ADR segment) never appear.
+- PriceModel is a lognormal random walk of the session centre,
+  reflected at the lowest and highest centre the source instrument
+  traded at, so even 90k sessions (about 350 years) stay positive and
+  plausible. Per-segment ranges and offsets are matched to the source
+  and prices are rounded to its price grid (instruments.py).
+
+Touch times fall on 5-minute bars inside the bucket's segment, and are
+NaT for untouched levels. Session dates follow the source's weekdays
+(Sunday-Thursday), so one instrument holds at most MAX_SESSIONS
+sessions before running out of datetime64[ns] range. Millions of
+sessions come from many instruments. Each instrument is generated and
+written on its own, so memory stays bounded by one instrument.
+
+Instruments are named after the price source, e.g. ``ES.SYN001``, so
+they get its spec (instruments.py) and load like shipped ones. Written
+next to the shipped CSVs (``--out .``), they can be served by
+data_store, query, server.py and the app:
+
+    python synth.py --source ES NQ CL --instruments 200 --sessions 20000 --out synth_out
+"""
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import aggregate
+import data_store
+import ingest
+import instruments
+import schema
+import session_engine
+
+N_STATES = aggregate.N_LABELS + 1  # the last state is a missing bucket
+START = pd.Timestamp("1900-01-01")
+MAX_SESSIONS = 90_000
+
+
+def _mutual_information(a: np.ndarray, b: np.ndarray) -> float:
+    joint = np.bincount(a * N_STATES + b, minlength=N_STATES * N_STATES)
+    joint = joint.reshape(N_STATES, N_STATES) / len(a)
+    outer = joint.sum(axis=1, keepdims=True) * joint.sum(axis=0, keepdims=True)
+    nz = joint > 0
+    return float((joint[nz] * np.log(joint[nz] / outer[nz])).sum())
+
+
+@dataclass
+class BucketModel:
+    marginals: np.ndarray  # (columns, N_STATES) probabilities
+    order: list            # columns in sampling order
+    parents: dict          # column -> [tree parent, its parent], as far as they exist
+    tables: dict           # column -> (N_STATES ** len(parents), N_STATES) probabilities
+
+    @classmethod
+    def fit(cls, frames: list[pd.DataFrame]) -> "BucketModel":
+        codes = np.concatenate([aggregate.bucket_codes(df) for df in frames])
+        states = np.where(codes < 0, N_STATES - 1, codes).astype(np.int64)
+        k = states.shape[1]
+        marginals = np.stack([
+            np.bincount(states[:, i], minlength=N_STATES) / len(states) for i in range(k)
+        ])
+
+        # maximum spanning tree over pairwise mutual information (Prim)
+        mi = np.zeros((k, k))
+        for a in range(k):
+            for b in range(a + 1, k):
+                mi[a, b] = mi[b, a] = _mutual_information(states[:, a], states[:, b])
+        order, tree_parent = [0], {0: None}
+        while len(order) < k:
+            a, b = max(((a, b) for a in order for b in range(k) if b not in tree_parent),
+                       key=lambda ab: mi[ab])
+            order.append(b)
+            tree_parent[b] = a
+
+        parents, tables = {}, {}
+        for i in order:
+            chosen = []
+            p = tree_parent[i]
+            while p is not None and len(chosen) < 2:
+                chosen.append(p)
+                p = tree_parent[p]
+            row = np.zeros(len(states), dtype=np.int64)
+            for j in chosen:
+                row = row * N_STATES + states[:, j]
+            counts = np.bincount(row * N_STATES + states[:, i],
+                                 minlength=N_STATES ** (len(chosen) + 1)).astype(float)
+            counts = counts.reshape(-1, N_STATES)
+            totals = counts.sum(axis=1, keepdims=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                tables[i] = np.where(totals > 0, counts / totals, 0.0)
+            parents[i] = chosen
+        return cls(marginals, order, parents, tables)
+
+    def sample(self, n: int, rng: np.random.Generator) -> np.ndarray:
+        """(n x columns) int8 bucket codes, -1 for missing."""
+        states = np.empty((n, len(self.order)), dtype=np.int64)
+        for i in self.order:
+            row = np.zeros(n, dtype=np.int64)
+            for j in self.parents[i]:
+                row = row * N_STATES + states[:, j]
+            probs = self.tables[i][row]
+            # can only happen through float rounding; fall back to the marginal
+            unseen = probs.sum(axis=1) == 0
+            probs[unseen] = self.marginals[i]
+            cum = np.cumsum(probs, axis=1)
+            u = rng.random(n)[:, None] * cum[:, -1:]
+            states[:, i] = np.minimum((u >= cum).sum(axis=1), N_STATES - 1)
+        return np.where(states == N_STATES - 1, -1, states).astype(np.int8)
+
+
+@dataclass
+class PriceModel:
+    symbol: str        # instrument whose price grid the prices use
+    start: float       # first session centre
+    volatility: float  # std of the session-to-session log change
+    low: float         # lowest and highest source centre; the walk
+    high: float        # is reflected between them
+    ranges: dict       # segment -> median (high - low) / centre
+    offsets: dict      # segment -> std of (segment mid - centre) / centre
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, symbol: str) -> "PriceModel":
+        raw = {c: df[c].to_numpy(np.float64) for c in schema.PRICE_COLUMNS}
+        centre = (raw["rdr_high"] + raw["rdr_low"]) / 2
+        logs = np.log(centre[np.isfinite(centre) & (centre > 0)])
+        ranges, offsets = {}, {}
+        for seg in session_engine.SEGMENT_KEYS:
+            high, low = raw[f"{seg}_high"], raw[f"{seg}_low"]
+            ranges[seg] = float(np.nanmedian((high - low) / centre))
+            offsets[seg] = float(np.nanstd(((high + low) / 2 - centre) / centre))
+        return cls(symbol, float(np.exp(logs[-1])), float(np.std(np.diff(logs))),
+                   float(np.exp(logs.min())), float(np.exp(logs.max())), ranges, offsets)
+
+    def sample(self, n: int, rng: np.random.Generator) -> dict[str, np.ndarray]:
+        """The 17 price columns for ``n`` consecutive sessions, on the price grid."""
+        per_point = instruments.spec(self.symbol).units_per_point
+        step = 2  # units per data increment; midlines may fall between
+
+        def on_grid(prices):
+            return np.rint(prices * per_point / step) * step
+
+        # fold the free walk into [log low, log high]: a reflected walk
+        lo, hi = np.log(self.low), np.log(self.high)
+        width = max(hi - lo, 1e-9)
+        walk = np.log(self.start) - lo + np.cumsum(rng.normal(0, self.volatility, n))
+        folded = np.mod(walk, 2 * width)
+        centre = np.exp(lo + np.where(folded > width, 2 * width - folded, folded))
+        units = {}
+        for seg in session_engine.SEGMENT_KEYS:
+            mid = centre * (1 + rng.normal(0, self.offsets[seg], n))
+            half = centre * self.ranges[seg] * rng.lognormal(0, 0.5, n) / 2
+            # at least one increment, so prices stay positive
+            units[f"{seg}_high"] = np.maximum(on_grid(mid + half), step)
+            low = np.maximum(on_grid(mid - half), step)
+            units[f"{seg}_low"] = np.minimum(low, units[f"{seg}_high"])
+
+        def midline(seg):
+            return np.floor((units[f"{seg}_high"] + units[f"{seg}_low"]) / 2)
+
+        def prev(values):
+            return np.r_[np.nan, values[:-1]]
+
+        units["prev_rdr_high"] = prev(units["rdr_high"])
+        units["prev_rdr_low"] = prev(units["rdr_low"])
+        units["prev_rdr_idr_midline"] = prev(midline("rdr"))
+        units["adr_idr_midline"] = midline("adr")
+        units["odr_idr_midline"] = midline("odr")
+        return {col: units[col] / per_point for col in schema.PRICE_COLUMNS}
+
+
+def session_dates(n: int, start=START) -> np.ndarray:
+    """``n`` consecutive Sunday-Thursday session dates from ``start``."""
+    if n > MAX_SESSIONS:
+        raise ValueError(f"At most {MAX_SESSIONS:,} sessions per instrument; "
+                         f"use more instruments instead")
+    days = pd.date_range(pd.Timestamp(start), periods=n * 7 // 5 + 7, freq="D")
+    days = days[days.dayofweek.isin([6, 0, 1, 2, 3])]
+    return days[:n].to_numpy(dtype="datetime64[ns]")
+
+
+def generate(buckets: BucketModel, prices: PriceModel, instrument: str, n: int,
+             seed: int | None = None, start=START) -> pd.DataFrame:
+    """A raw-schema Session_Hits frame with ``n`` synthetic sessions."""
+    rng = np.random.default_rng(seed)
+    dates = session_dates(n, start)
+    codes = buckets.sample(n, rng)
+
+    out = {"session_date": dates}
+    out.update(prices.sample(n, rng))
+
+    opens = dates + session_engine.SESSION_OPEN.to_timedelta64()
+    windows = np.array(list(schema.SEGMENT_WINDOWS.values()))
+    for j, level in enumerate(schema.TOUCH_LEVELS):
+        code = codes[:, j].astype(np.int64)
+        in_segment = (code >= 0) & (code < len(windows))
+        seg = np.where(in_segment, code, 0)
+        bars = (windows[seg, 1] - windows[seg, 0]) // 5
+        minute = windows[seg, 0] + 5 * (rng.random(n) * bars).astype(np.int64)
+        touch = opens + minute.astype("timedelta64[m]")
+        out[f"{level}_touch"] = np.where(in_segment, touch, np.datetime64("NaT"))
+        out[f"{level}_touch_time_bucket"] = pd.Categorical.from_codes(
+            code, dtype=schema.BUCKET_DTYPE
+        )
+
+    out["Instrument"] = instrument
+    return schema.enforce(pd.DataFrame(out))
+
+
+def fit(sources: list[str]) -> tuple[BucketModel, PriceModel]:
+    """Models learned from the shipped data of ``sources``; prices from the first."""
+    frames = [schema.read_csv(data_store.csv_path(inst)) for inst in sources]
+    return BucketModel.fit(frames), PriceModel.fit(frames[0], sources[0])
+
+
+def prepared(df: pd.DataFrame) -> pd.DataFrame:
+    """The store schema of a synthetic frame, as data_store would load it."""
+    return ingest.prepare(df)
+
+
+def write(df: pd.DataFrame, out: Path, formats=("csv", "parquet")) -> list[Path]:
+    """Write ``df`` next to the shipped naming scheme; returns the paths."""
+    out.mkdir(parents=True, exist_ok=True)
+    stem = data_store.csv_path(str(df["Instrument"].iloc[0])).stem
+    paths = []
+    if "csv" in formats:
+        paths.append(out / f"{stem}.csv")
+        paths[-1].write_bytes(data_store.csv_bytes(df))
+    if "parquet" in formats:
+        paths.append(out / f"{stem}.parquet")
+        df.to_parquet(paths[-1], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate synthetic Session_Hits data")
+    parser.add_argument("--source", nargs="+", default=data_store.INSTRUMENTS,
+                        help="instruments to learn from; prices follow the first")
+    parser.add_argument("--instruments", type=int, default=1)
+    parser.add_argument("--sessions", type=int, default=20_000,
+                        help=f"sessions per instrument (at most {MAX_SESSIONS:,})")
+    parser.add_argument("--prefix", default="SYN",
+                        help="instruments are named <first source>.<prefix><n>")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", nargs="+", choices=["csv", "parquet"],
+                        default=["csv", "parquet"])
+    parser.add_argument("--out", type=Path, default=Path("synth_out"))
+    args = parser.parse_args()
+
+    bucket_model, price_model = fit(args.source)
+    width = len(str(args.instruments))
+    for i in range(args.instruments):
+        name = instruments.synthetic_symbol(args.source[0], f"{args.prefix}{i + 1:0{width}d}")
+        frame = generate(bucket_model, price_model, name, args.sessions, seed=args.seed + i)
+        for path in write(frame, args.out, args.format):
+            print(f"{name}: {len(frame):,} sessions -> {path}")
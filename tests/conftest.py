@@ -0,0 +1,29 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "tests"))
+
+import data_store  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory with its own store, in place of the repo's."""
+    monkeypatch.setattr(data_store, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(data_store, "STORE_DIR", tmp_path / "store")
+    monkeypatch.setattr(data_store, "MANIFEST_PATH", tmp_path / "store" / "manifest.json")
+    return tmp_path
+
+
+@pytest.fixture
+def shipped(data_dir):
+    """Copy a shipped instrument CSV into ``data_dir``; returns its path."""
+    def copy(instrument):
+        src = ROOT / data_store.csv_path(instrument).name
+        return Path(shutil.copy(src, data_store.csv_path(instrument)))
+    return copy
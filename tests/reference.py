@@ -0,0 +1,85 @@
+"""Straightforward per-bar implementations to check the vectorized code against."""
+import numpy as np
+import pandas as pd
+
+import schema
+import session_engine
+
+WINDOWS = schema.SEGMENT_WINDOWS
+
+
+def synthetic_bars(days: int = 40, seed: int = 0, start: str = "2020-01-05",
+                   gaps: bool = True) -> pd.DataFrame:
+    """A random walk of 5-minute bars on a 0.25 grid, minus the maintenance
+    hour and (with ``gaps``) a few random bars."""
+    rng = np.random.default_rng(seed)
+    ts = pd.date_range(start, periods=days * 288, freq="5min")
+    ts = ts[ts.hour != 17]
+    if gaps:
+        ts = ts[rng.random(len(ts)) > 0.02]
+    n = len(ts)
+    opens = 1000 + np.cumsum(rng.integers(-4, 5, n)) * 0.25
+    closes = opens + rng.integers(-8, 9, n) * 0.25
+    return pd.DataFrame({
+        "timestamp": ts,
+        "open": opens,
+        "high": np.maximum(opens, closes) + rng.integers(0, 6, n) * 0.25,
+        "low": np.minimum(opens, closes) - rng.integers(0, 6, n) * 0.25,
+        "close": closes,
+    })
+
+
+def _segment(minute: int) -> str:
+    return next(seg for seg, (start, end) in WINDOWS.items() if start <= minute < end)
+
+
+def reference_rows(bars: pd.DataFrame, instrument: str) -> pd.DataFrame:
+    """Session_Hits rows for ``bars``, one session and one bar at a time."""
+    bars = bars.sort_values("timestamp", kind="stable")
+    dates, minutes = session_engine.session_clock(bars["timestamp"].to_numpy())
+    bars = bars.assign(session_date=dates.astype("datetime64[ns]"), minute=minutes)
+    bars = bars[bars["minute"] < session_engine.SESSION_MINUTES]
+
+    rows, prev = [], None
+    for date, session in bars.groupby("session_date"):
+        levels = {}
+        for seg, (start, end) in WINDOWS.items():
+            seg_bars = session[(session["minute"] >= start) & (session["minute"] < end)]
+            if len(seg_bars):
+                body_high = np.maximum(seg_bars["open"], seg_bars["close"]).max()
+                body_low = np.minimum(seg_bars["open"], seg_bars["close"]).min()
+                levels[seg] = (seg_bars["high"].max(), seg_bars["low"].min(),
+                               (body_high + body_low) / 2)
+            else:
+                levels[seg] = (np.nan, np.nan, np.nan)
+
+        row = {"session_date": date}
+        row["prev_rdr_high"], row["prev_rdr_low"], prev_mid = prev or (np.nan,) * 3
+        for seg in WINDOWS:
+            row[f"{seg}_high"], row[f"{seg}_low"], _ = levels[seg]
+        row["prev_rdr_idr_midline"] = prev_mid
+        row["adr_idr_midline"] = levels["adr"][2]
+        row["odr_idr_midline"] = levels["odr"][2]
+
+        for name, kind, start in session_engine.LEVELS:
+            level = row[name]
+            touch, bucket = pd.NaT, "untouched"
+            above = below = False
+            after = session[session["minute"] >= start]
+            for ts, high, low, minute in zip(after["timestamp"], after["high"],
+                                             after["low"], after["minute"]):
+                if np.isnan(level):
+                    break
+                above |= high >= level
+                below |= low <= level
+                hit = {"high": above, "low": below, "mid": above and below}[kind]
+                if hit:
+                    touch, bucket = ts, _segment(minute)
+                    break
+            row[f"{name}_touch"] = touch
+            row[f"{name}_touch_time_bucket"] = bucket
+
+        row["Instrument"] = instrument
+        rows.append(row)
+        prev = levels["rdr"]
+    return schema.enforce(pd.DataFrame(rows))
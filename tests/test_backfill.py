@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+import backfill
+import bar_store
+import session_engine
+from reference import synthetic_bars
+
+
+@pytest.fixture
+def bars_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(bar_store, "BARS_DIR", tmp_path / "bars")
+    bars = synthetic_bars(days=70, seed=5, start="2019-11-10 18:00")
+    path = backfill.bars_path("ES")
+    path.parent.mkdir()
+    bars.to_csv(path, index=False)
+    return bars
+
+
+def _sharded(years_per_shard=1):
+    shards = backfill.plan_shards(["ES"], 2019, 2020, years_per_shard)
+    frames = [backfill.run_shard(shard)[1] for shard in shards]
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_read_bar_range_stops_after_end(bars_dir):
+    path = backfill.bars_path("ES")
+    # out-of-order rows past the range would fail the sort check if read
+    with open(path, "a") as f:
+        f.write("2019-01-01 00:00:00,1,1,1,1\n" * 10)
+
+    start, end = pd.Timestamp("2019-12-01"), pd.Timestamp("2019-12-08")
+    bars = backfill.read_bar_range(path, start, end, chunksize=500)
+    expected = bars_dir[(bars_dir["timestamp"] >= start) & (bars_dir["timestamp"] < end)]
+    pd.testing.assert_frame_equal(bars, expected.reset_index(drop=True))
+
+    with pytest.raises(ValueError, match="not sorted"):
+        backfill.read_bar_range(path, start, pd.Timestamp("2030-01-01"), chunksize=500)
+
+
+def test_shards_match_full_run(bars_dir):
+    full = session_engine.process_bars(bars_dir, "ES")
+    pd.testing.assert_frame_equal(_sharded(), full)
+
+    backfill.convert_bars(["ES"], log=lambda msg: None)
+    assert bar_store.exists("ES")
+    pd.testing.assert_frame_equal(_sharded(), full)
@@ -0,0 +1,71 @@
+import pandas as pd
+import pytest
+
+import data_store
+import schema
+
+
+class Crash(Exception):
+    pass
+
+
+def _new_rows(instrument, n=3):
+    """The last ``n`` shipped sessions, moved past the end of the history."""
+    raw = schema.read_csv(data_store.csv_path(instrument))
+    rows = raw.tail(n).copy()
+    rows["session_date"] = raw["session_date"].max() + pd.to_timedelta(range(1, n + 1), "D")
+    return rows.reset_index(drop=True)
+
+
+def test_append_sessions(shipped):
+    shipped("ES")
+    before = data_store.load_instrument("ES")
+    version = data_store.read_manifest()["ES"]["version"]
+
+    entry = data_store.append_sessions("ES", _new_rows("ES"))
+
+    assert entry["version"] == version + 1
+    assert data_store.is_current("ES")
+    after = data_store.load_instrument("ES")
+    assert len(after) == len(before) + 3
+    assert len(schema.read_csv(data_store.csv_path("ES"))) == len(after)
+
+
+@pytest.mark.parametrize("step", ["_write_parquet", "_record"])
+def test_append_sessions_crash_rebuilds_from_csv(shipped, monkeypatch, step):
+    shipped("ES")
+    before = data_store.load_instrument("ES")
+    old_version = data_store.data_version("ES")
+    rows = _new_rows("ES")
+
+    def crash(*args, **kwargs):
+        raise Crash
+
+    with monkeypatch.context() as m:
+        m.setattr(data_store, step, crash)
+        with pytest.raises(Crash):
+            data_store.append_sessions("ES", rows)
+
+    # the CSV has the new rows, so the store must not be considered current
+    assert not data_store.is_current("ES")
+    after = data_store.load_instrument("ES")
+    assert len(after) == len(before) + len(rows)
+    assert after["session_date"].max() == rows["session_date"].max()
+    assert data_store.data_version("ES") != old_version
+
+
+def test_append_sessions_crash_before_csv_changes_nothing(shipped, monkeypatch):
+    shipped("ES")
+    before = data_store.load_instrument("ES")
+    version = data_store.data_version("ES")
+
+    def crash(*args, **kwargs):
+        raise Crash
+
+    monkeypatch.setattr(data_store, "_atomic_write_bytes", crash)
+    with pytest.raises(Crash):
+        data_store.append_sessions("ES", _new_rows("ES"))
+
+    assert data_store.is_current("ES")
+    assert data_store.data_version("ES") == version
+    pd.testing.assert_frame_equal(data_store.load_instrument("ES"), before)
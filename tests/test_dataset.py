@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+from dataset import Dataset
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    return Dataset.load("ES")
+
+
+def _buffers(series: pd.Series) -> list[np.ndarray]:
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        return [values.codes.base]
+    if isinstance(values, pd.arrays.IntegerArray):
+        return [values._data, values._mask]
+    return [series.to_numpy().base]
+
+
+def test_frame_matches_store(dataset):
+    pd.testing.assert_frame_equal(dataset.frame, data_store.load_instrument("ES"))
+
+
+def test_frame_buffers_are_read_only(dataset):
+    for col in dataset.frame.columns:
+        for buf in _buffers(dataset.frame[col]):
+            assert not buf.flags.writeable, col
+            with pytest.raises(ValueError):
+                buf[:1] = buf[:1]
+
+
+def test_view_writes_do_not_reach_the_dataset(dataset):
+    before = dataset.frame.copy()
+    df = dataset.view()
+    assert np.shares_memory(_buffers(df["date"])[0], _buffers(dataset.frame["date"])[0])
+
+    df.loc[0, "rdr_high"] = -1
+    df["odr_high_touch_time_bucket"] = df["odr_high_touch_time_bucket"].cat.codes
+    df["extra"] = 1
+    pd.testing.assert_frame_equal(dataset.frame, before)
+
+
+INGEST_STEPS = ["read csv", "date parsing", "price units", "label mapping", "date column",
+                "write store"]
+
+
+def test_load_timings_cover_the_ingest_steps(shipped):
+    shipped("ES")
+    built = Dataset.load("ES").timings
+    assert list(built)[:len(INGEST_STEPS)] == INGEST_STEPS
+    assert {"read store", "bucket codes", "bitmap index"} <= set(built)
+
+    # from the store: the ingest steps are those of the build, marked as such
+    reloaded = Dataset.load("ES").timings
+    assert [f"{step} (last build)" for step in INGEST_STEPS] == list(reloaded)[:len(INGEST_STEPS)]
+    assert reloaded["label mapping (last build)"] == pytest.approx(built["label mapping"], abs=1e-6)
+    assert "read csv" not in reloaded
@@ -0,0 +1,157 @@
+"""build_mask, BitmapIndex, grouped_bucket_counts and rank_conditions
+against the original script's chained pandas path."""
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregate
+import bitmap_index
+import data_store
+import filters
+import ingest
+import schema
+import search
+
+LABELS = list(schema.LABEL_DTYPE.categories)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    """(raw CSV frame with the original labels, prepared frame), with some
+    buckets blanked so missing values are covered."""
+    raw = pd.read_csv(data_store.csv_path("ES"), index_col=0)
+    rng = np.random.default_rng(0)
+    for col in schema.BUCKET_COLUMNS[::4]:
+        raw.loc[rng.random(len(raw)) < 0.05, col] = np.nan
+    legacy = raw.replace(schema.BUCKET_LABELS)
+    legacy["date"] = pd.to_datetime(legacy["session_date"])
+    return legacy, ingest.prepare(raw.assign(session_date=legacy["date"]), "ES")
+
+
+def legacy_filter(df, day="All", date_range=None, inclusions=None, exclusions=None):
+    """The original script's filters."""
+    if day != "All":
+        df = df[(df["date"] + pd.Timedelta(days=1)).dt.day_name() == day]
+    if date_range is not None:
+        df = df[(df["date"] >= pd.to_datetime(date_range[0]))
+                & (df["date"] <= pd.to_datetime(date_range[1]))]
+    for col, sel in (inclusions or {}).items():
+        df = df[df[col] == sel]
+    for col, excludes in (exclusions or {}).items():
+        df = df[~df[col].isin(excludes)]
+    return df
+
+
+def random_mixes(n, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n):
+        start = pd.Timestamp("2008-01-01") + pd.Timedelta(days=rng.randint(0, 5000))
+        yield {
+            "day": rng.choice(["All"] + filters.DAY_NAMES[:5]),
+            "date_range": rng.choice([None, (start.date(), (start + pd.Timedelta(
+                days=rng.randint(0, 3000))).date())]),
+            "inclusions": {c: rng.choice(LABELS)
+                           for c in rng.sample(schema.BUCKET_COLUMNS, rng.randint(0, 2))},
+            "exclusions": {c: rng.sample(LABELS, rng.randint(1, 3))
+                           for c in rng.sample(schema.BUCKET_COLUMNS, rng.randint(0, 3))},
+        }
+
+
+@pytest.mark.parametrize("mix", list(random_mixes(60)))
+def test_filters_match_legacy(frames, mix):
+    legacy, df = frames
+    expected = legacy_filter(legacy, **mix)
+
+    mask = filters.build_mask(df, **mix)
+    np.testing.assert_array_equal(np.flatnonzero(mask), expected.index.to_numpy())
+
+    index = bitmap_index.BitmapIndex(df)
+    np.testing.assert_array_equal(index.mask(**mix), mask)
+    assert index.count(index.query(**mix)) == mask.sum()
+
+    table, n = aggregate.bucket_distributions(aggregate.bucket_codes(df), mask)
+    assert n == len(expected)
+    for col in schema.BUCKET_COLUMNS:
+        counts = expected[col].value_counts(normalize=True) * 100
+        np.testing.assert_allclose(table.loc[col].to_numpy(),
+                                   counts.reindex(LABELS, fill_value=0).to_numpy(),
+                                   err_msg=col)
+
+
+def test_missing_buckets_survive_exclusions(frames):
+    _, df = frames
+    col = schema.BUCKET_COLUMNS[0]
+    missing = df[col].isna().to_numpy()
+    assert missing.any()
+    mask = filters.build_mask(df, exclusions={col: LABELS})
+    np.testing.assert_array_equal(mask, missing)
+    np.testing.assert_array_equal(bitmap_index.BitmapIndex(df).mask(exclusions={col: LABELS}),
+                                  missing)
+
+
+def test_bitmap_unsorted_dates(frames):
+    _, df = frames
+    shuffled = df.sample(frac=1, random_state=1).reset_index(drop=True)
+    index = bitmap_index.BitmapIndex(shuffled)
+    assert not index.is_sorted
+    for mix in random_mixes(10, seed=1):
+        np.testing.assert_array_equal(index.mask(**mix), filters.build_mask(shuffled, **mix))
+
+
+@pytest.mark.parametrize("n", [1, 7, 8, 9, 15, 16, 17, 24])
+def test_bitmap_range_byte_boundaries(n):
+    dates = pd.Series(pd.date_range("2020-01-01", periods=n))
+    df = pd.DataFrame({"date": dates, **{
+        col: pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), dtype=schema.LABEL_DTYPE)
+        for col in schema.BUCKET_COLUMNS
+    }})
+    index = bitmap_index.BitmapIndex(df)
+    for start in range(n + 1):
+        for stop in range(n + 1):
+            expected = np.zeros(n, dtype=bool)
+            expected[start:stop] = True
+            np.testing.assert_array_equal(index.to_mask(index._range(start, stop)), expected,
+                                          err_msg=f"{start}:{stop}")
+
+
+def test_grouped_bucket_counts(frames):
+    _, df = frames
+    codes = aggregate.bucket_codes(df)
+    groups = np.arange(len(df)) % 3
+    mask = filters.build_mask(df, day="Tuesday")
+    counts = aggregate.grouped_bucket_counts(codes, groups, 3, mask)
+    for g in range(3):
+        part = df[mask & (groups == g)]
+        for j, col in enumerate(schema.BUCKET_COLUMNS):
+            expected = part[col].value_counts().reindex(LABELS, fill_value=0)
+            np.testing.assert_array_equal(counts[g, j], expected.to_numpy(), err_msg=col)
+
+
+def test_rank_conditions_against_pandas(frames):
+    _, df = frames
+    codes = aggregate.bucket_codes(df)
+    target, bucket = "odr_high_touch_time_bucket", "RDR"
+    mask = filters.build_mask(df, day="Wednesday")
+    ranked = search.rank_conditions(codes, target, bucket, mask, min_sessions=1)
+
+    base = df[mask & df[target].notna().to_numpy()]
+    base_rate = (base[target] == bucket).mean()
+
+    def check(row, cond):
+        met = base[cond(base)]
+        assert row["sessions"] == len(met)
+        assert row["hits"] == (met[target] == bucket).sum()
+        assert row["lift"] == pytest.approx((met[target] == bucket).mean() / base_rate)
+
+    single = ranked[ranked["column_2"].isna()].iloc[0]
+    check(single, lambda d: d[single["column"]] == single["bucket"])
+
+    pair = ranked[ranked["column_2"].notna()].iloc[0]
+    check(pair, lambda d: (d[pair["column"]] == pair["bucket"])
+          & (d[pair["column_2"]] == pair["bucket_2"]))
+
+    assert not (ranked["column"] == target).any()
+    assert not (ranked["column_2"] == target).any()
+    assert ranked["lift"].is_monotonic_decreasing
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+import ingest
+import instruments
+import schema
+
+
+def test_to_units_round_trip():
+    prices = pd.Series([4.125, np.nan, 2.6055], name="adr_high")
+    units = instruments.to_units(prices, "NG")
+    assert list(units.isna()) == [False, True, False]
+    np.testing.assert_array_equal(instruments.to_prices(units, "NG"), prices.to_numpy())
+
+
+def test_to_units_out_of_range_raises():
+    prices = pd.Series([3.0, 3.68e12, np.nan], name="rdr_high")
+    with pytest.raises(ValueError, match=r"NG .*'rdr_high'"):
+        instruments.to_units(prices, "NG")
+    # just inside and just outside the range
+    limit = np.iinfo(np.int32).max / instruments.spec("ES").units_per_point
+    instruments.to_units([limit], "ES")
+    with pytest.raises(ValueError):
+        instruments.to_units([limit + 1], "ES")
+
+
+def test_prepare_rejects_out_of_range_prices():
+    df = schema.read_csv(data_store.csv_path("NG")).head(3)
+    df.loc[1, "odr_low"] = 1e9
+    with pytest.raises(ValueError, match="'odr_low'"):
+        ingest.prepare(df)
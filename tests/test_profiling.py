@@ -0,0 +1,52 @@
+import json
+import logging
+
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def clean_logger():
+    logger = profiling.logger
+    saved = logger.handlers[:], logger.level, logger.propagate
+    logger.handlers.clear()
+    yield logger
+    for handler in logger.handlers:
+        handler.close()
+    logger.handlers[:], logger.level, logger.propagate = saved
+
+
+def test_emit_writes_json_lines(clean_logger, tmp_path, monkeypatch):
+    path = tmp_path / "profile.jsonl"
+    monkeypatch.setenv(profiling.LOG_PATH_ENV, str(path))
+    logging.getLogger().setLevel(logging.WARNING)
+
+    for i in range(2):
+        profiler = profiling.Profiler(True, instrument="ES", rerun=i)
+        with profiler.stage("filtering"):
+            pass
+        profiler.emit()
+    assert len(clean_logger.handlers) == 1
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["rerun"] for r in records] == [0, 1]
+    assert records[0]["event"] == "rerun"
+    assert [s["stage"] for s in records[0]["stages"]] == ["filtering"]
+
+
+def test_disabled_profiler_emits_nothing(clean_logger, tmp_path, monkeypatch):
+    monkeypatch.setenv(profiling.LOG_PATH_ENV, str(tmp_path / "profile.jsonl"))
+    profiler = profiling.Profiler(False)
+    with profiler.stage("filtering"):
+        pass
+    profiler.emit()
+    assert profiler.stages == []
+    assert not clean_logger.handlers
+
+
+def test_existing_handler_is_kept(clean_logger):
+    handler = logging.NullHandler()
+    clean_logger.addHandler(handler)
+    profiling.Profiler(True).emit()
+    assert clean_logger.handlers == [handler]
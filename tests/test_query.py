@@ -0,0 +1,30 @@
+import json
+
+import query
+
+
+def test_run_batch_reports_bad_lines_and_continues():
+    lines = [
+        '{"instrument": "ES", "day": "Monday"}\n',
+        '{"instrument": "ES", "bogus": 1}\n',
+        "not json\n",
+        "\n",
+        '["ES"]\n',
+        '{"day": "Friday"}\n',
+        '{"instrument": "ES", "day": "Someday"}\n',
+        '{"instrument": "NOPE"}\n',
+        '{"instrument": "ES", "inclusions": 5}\n',
+        '{"instrument": "ES", "exclusions": {"odr_low": "RDR"}}\n',
+        '{"inclusions": {"adr_high": "ODR"}}\n',
+    ]
+    records = list(query.run_batch(lines))
+    assert [r.get("line") for r in records] == [None, 2, 3, 5, 6, 7, 8, 9, 10, 11]
+    assert records[0]["sessions"] > 0
+    assert "bogus" in records[1]["error"]
+    assert all("error" in r for r in records[1:])
+    json.dumps(records)
+
+    # lines without an instrument use the default
+    records = list(query.run_batch(lines[-1:], instrument="ES"))
+    assert records[0]["instrument"] == "ES" and "error" not in records[0]
+    assert records[0]["filters"] == {"inclusions": {"adr_high": "ODR"}}
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+import query
+import server
+
+
+def test_cancelled_leader_releases_followers(monkeypatch):
+    release = threading.Event()
+    original = query.query
+
+    def slow_query(instrument, **filters):
+        release.wait(5)
+        return original(instrument, **filters)
+
+    monkeypatch.setattr(query, "query", slow_query)
+    service = server.DistributionService()
+
+    async def scenario():
+        payload = {"instrument": "ES", "day": "Tuesday"}
+        leader = asyncio.create_task(service.distributions(payload))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(service.distributions(payload))
+        await asyncio.sleep(0.05)
+        assert service.coalesced == 1
+
+        leader.cancel()
+        with pytest.raises(server.HTTPError) as err:
+            await asyncio.wait_for(follower, timeout=2)
+        assert err.value.status == 503
+        assert not service._inflight
+        release.set()
+
+        # the next identical request computes again
+        result = await asyncio.wait_for(service.distributions(payload), timeout=10)
+        assert result["sessions"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_unknown_instrument_is_404_without_loading():
+    registry = query.registry()
+    known = set(registry._futures)
+    service = server.DistributionService()
+
+    async def scenario():
+        for name in ["NOPE", "ES.NOPE", "../ES"]:
+            with pytest.raises(server.HTTPError) as err:
+                await service.distributions({"instrument": name})
+            assert err.value.status == 404
+        with pytest.raises(server.HTTPError) as err:
+            await service.distributions({"instrument": ["ES"]})
+        assert err.value.status == 400
+
+    asyncio.run(scenario())
+    assert set(registry._futures) == known
@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import schema
+import session_engine
+from reference import reference_rows, synthetic_bars
+
+FIXTURE = Path(__file__).parent / "fixtures" / "ES_5m.csv"
+
+
+def _drop_segment(bars: pd.DataFrame, day: int, segment: str) -> pd.DataFrame:
+    """``bars`` without the given segment of the ``day``-th session."""
+    dates, minutes = session_engine.session_clock(bars["timestamp"].to_numpy())
+    start, end = schema.SEGMENT_WINDOWS[segment]
+    drop = (dates == np.unique(dates)[day]) & (minutes >= start) & (minutes < end)
+    return bars[~drop].reset_index(drop=True)
+
+
+def assert_sessions_equal(generated: pd.DataFrame, expected: pd.DataFrame) -> None:
+    assert list(generated.columns) == schema.COLUMNS
+    pd.testing.assert_series_equal(generated["session_date"], expected["session_date"])
+    for col in schema.PRICE_COLUMNS + schema.TOUCH_COLUMNS + schema.BUCKET_COLUMNS:
+        pd.testing.assert_series_equal(generated[col], expected[col], obj=col)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_process_bars_matches_reference(seed):
+    bars = synthetic_bars(days=40, seed=seed)
+    assert_sessions_equal(session_engine.process_bars(bars, "ES"), reference_rows(bars, "ES"))
+
+
+@pytest.mark.parametrize("segment", ["pre_adr", "adr", "odr", "rdr"])
+def test_process_bars_missing_segment(segment):
+    bars = _drop_segment(synthetic_bars(days=6, seed=3), 2, segment)
+    result = session_engine.process_bars(bars, "ES")
+    assert_sessions_equal(result, reference_rows(bars, "ES"))
+    assert result[[f"{segment}_high", f"{segment}_low"]].iloc[2].isna().all()
+    if segment == "rdr":
+        assert np.isnan(result["prev_rdr_idr_midline"].iloc[3])
+
+
+def test_process_bars_unsorted_and_empty():
+    bars = synthetic_bars(days=5, seed=4)
+    shuffled = bars.sample(frac=1, random_state=0)
+    assert_sessions_equal(session_engine.process_bars(shuffled, "ES"),
+                          session_engine.process_bars(bars, "ES"))
+    assert session_engine.process_bars(bars.iloc[:0], "ES").empty
+
+
+def test_compare_frames_fixture():
+    bars = session_engine.load_bars(FIXTURE)
+    result = session_engine.process_bars(bars, "ES")
+    assert len(result) == 4
+
+    rates = session_engine.compare_frames(result, reference_rows(bars, "ES"), "ES")
+    assert list(rates.index) == schema.PRICE_COLUMNS + schema.TOUCH_COLUMNS + schema.BUCKET_COLUMNS
+    assert (rates == 1.0).all()
+
+    # one session off by a single price unit, one bucket changed
+    changed = result.copy()
+    changed.loc[1, "adr_high"] += 0.125
+    changed.loc[2, "odr_low_touch_time_bucket"] = "untouched"
+    rates = session_engine.compare_frames(changed, result, "ES")
+    assert rates["adr_high"] == 0.75
+    assert rates["odr_low_touch_time_bucket"] == 0.75
+    assert rates.drop(["adr_high", "odr_low_touch_time_bucket"]).eq(1.0).all()
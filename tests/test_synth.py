@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+import instruments
+import query
+import schema
+import synth
+
+
+@pytest.fixture(scope="module")
+def models():
+    return synth.fit(["ES"])
+
+
+def test_synthetic_spec():
+    name = instruments.synthetic_symbol("CL", "SYN01")
+    assert name == "CL.SYN01"
+    assert instruments.spec(name).units_per_point == instruments.spec("CL").units_per_point
+    with pytest.raises(KeyError):
+        instruments.synthetic_symbol("XX", "SYN01")
+    with pytest.raises(KeyError):
+        instruments.spec("SYN01")
+
+
+def test_generate_schema_and_marginals(models):
+    bucket_model, price_model = models
+    df = synth.generate(bucket_model, price_model, "ES.SYN1", 20_000, seed=0)
+    assert list(df.columns) == schema.COLUMNS
+    assert df["session_date"].is_monotonic_increasing
+    for j, col in enumerate(schema.BUCKET_COLUMNS):
+        share = df[col].value_counts(normalize=True).reindex(schema.BUCKET_VALUES, fill_value=0)
+        expected = bucket_model.marginals[j, :len(schema.BUCKET_VALUES)]
+        assert np.abs(share.to_numpy() - expected).max() < 0.02, col
+        # untouched levels have no touch time and vice versa
+        untouched = df[col] == "untouched"
+        assert df.loc[untouched, col.replace("_time_bucket", "")].isna().all()
+
+
+def test_load_round_trip(data_dir, models):
+    bucket_model, price_model = models
+    name = instruments.synthetic_symbol("ES", "SYN1")
+    df = synth.generate(bucket_model, price_model, name, 500, seed=1)
+    csv, parquet = synth.write(df, data_dir)
+    assert csv == data_store.csv_path(name)
+    pd.testing.assert_frame_equal(schema.read_csv(csv), df)
+    pd.testing.assert_frame_equal(pd.read_parquet(parquet), df)
+
+    assert name in data_store.local_instruments()
+    pd.testing.assert_frame_equal(data_store.load_instrument(name), synth.prepared(df))
+
+    table, n = query.query(name, inclusions={"adr_high": "ODR"})
+    assert n == (df["adr_high_touch_time_bucket"] == "odr").sum()
+    assert table.loc["adr_high_touch_time_bucket", "ODR"] == pytest.approx(100.0)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 10])
+def test_max_length_prices_stay_in_source_range(seed):
+    bucket_model, price_model = synth.fit(["NG"])
+    df = synth.generate(bucket_model, price_model, "NG.SYN1", synth.MAX_SESSIONS, seed=seed)
+    prices = df[schema.PRICE_COLUMNS].to_numpy(np.float64)
+    assert np.nanmin(prices) > price_model.low / 2
+    assert np.nanmax(prices) < price_model.high * 2
+
+    prepared = synth.prepared(df)
+    for col in schema.PRICE_COLUMNS:
+        back = instruments.to_prices(prepared[col].array, "NG.SYN1")
+        np.testing.assert_allclose(back, df[col].to_numpy(np.float64), rtol=1e-6)
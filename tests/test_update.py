@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+import data_store
+import schema
+import session_engine
+import update
+from reference import synthetic_bars
+
+
+@pytest.fixture
+def stored(data_dir):
+    """ES bars for 30 sessions, with the first 20 sessions stored."""
+    bars = synthetic_bars(days=30, seed=6, start="2021-06-06 18:00")
+    full = session_engine.process_bars(bars, "ES")
+    data_store.write_csv("ES", full.iloc[:20])
+    return bars, full
+
+
+def test_update_matches_full_run(stored):
+    bars, full = stored
+    last = full["session_date"].iloc[19]
+    feed = bars[bars["timestamp"] >= last]  # from the last stored session on
+
+    assert update.update_instrument("ES", feed) == 10
+    pd.testing.assert_frame_equal(schema.read_csv(data_store.csv_path("ES")), full)
+    assert data_store.is_current("ES")
+
+    # nothing new the second time
+    assert update.update_instrument("ES", feed) == 0
+
+
+def test_update_without_overlap_session_is_refused(stored):
+    bars, full = stored
+    first_new = full["session_date"].iloc[20] + session_engine.SESSION_OPEN
+    before = data_store.csv_path("ES").read_bytes()
+
+    with pytest.raises(ValueError, match="RDR of the last stored session"):
+        update.update_instrument("ES", bars[bars["timestamp"] >= first_new])
+    assert data_store.csv_path("ES").read_bytes() == before
+
+
+def test_new_sessions_empty_is_raw_schema(stored):
+    bars, full = stored
+    rows = update.new_sessions("ES", bars, full["session_date"].iloc[-1])
+    assert rows.empty
+    assert list(rows.columns) == schema.COLUMNS
@@ -0,0 +1,59 @@
+"""Incremental daily update of an instrument from new 5-minute bars.
+
+Only sessions after the last stored ``session_date`` are processed. The
+last stored session is re-run as overlap because its RDR supplies the
+``prev_rdr_*`` levels of the first new session; it is then dropped. A
+feed must therefore include at least the last stored session's RDR, or
+the update is refused rather than appending sessions without
+``prev_rdr_*`` levels.
+"""
+import pandas as pd
+
+import data_store
+import schema
+import session_engine
+
+
+def new_sessions(instrument: str, bars: pd.DataFrame, last_date: pd.Timestamp) -> pd.DataFrame:
+    """Raw-schema rows for the sessions in ``bars`` after ``last_date``.
+
+    Raises ValueError when ``bars`` has new sessions but no bar in
+    ``last_date``'s RDR window.
+    """
+    overlap_open = pd.Timestamp(last_date) + session_engine.SESSION_OPEN
+    bars = bars[bars["timestamp"] >= overlap_open]
+    rdr_start, rdr_end = (overlap_open + pd.Timedelta(minutes=m)
+                          for m in schema.SEGMENT_WINDOWS["rdr"])
+    if not (bars["timestamp"] >= overlap_open + pd.Timedelta(days=1)).any():
+        return schema.enforce(pd.DataFrame(columns=schema.COLUMNS))
+    if not bars["timestamp"].between(rdr_start, rdr_end, inclusive="left").any():
+        raise ValueError(
+            f"{instrument}: bars start after the RDR of the last stored session "
+            f"({pd.Timestamp(last_date).date()}), which the first new session's "
+            f"prev_rdr_* levels need; include it"
+        )
+    rows = session_engine.process_bars(bars, instrument)
+    return rows[rows["session_date"] > last_date].reset_index(drop=True)
+
+
+def update_instrument(instrument: str, bars: pd.DataFrame) -> int:
+    """Append the sessions in ``bars`` newer than the store; returns how many."""
+    stored = data_store.load_instrument(instrument)
+    rows = new_sessions(instrument, bars, stored["session_date"].max())
+    if rows.empty:
+        return 0
+    data_store.append_sessions(instrument, rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Append new sessions from 5-minute bars")
+    parser.add_argument("instrument")
+    parser.add_argument("bars", help="CSV with timestamp,open,high,low,close")
+    args = parser.parse_args()
+
+    added = update_instrument(args.instrument, session_engine.load_bars(args.bars))
+    version = data_store.data_version(args.instrument)
+    print(f"{args.instrument}: appended {added} sessions (data version {version})")